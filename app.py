@@ -1,13 +1,61 @@
+from __future__ import annotations
+
 import streamlit as st
 import sqlite3
 import json
+import asyncio
+import atexit
+import bisect
+import contextlib
+import csv
 import datetime
-import requests
-import pandas as pd
-import plotly.express as px
+import email.utils
+import functools
+import hashlib
+import hmac
+import importlib
+import importlib.util
+import io
+import itertools
+import logging
+import random
+import re
 import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+from contextlib import contextmanager
 from dotenv import load_dotenv
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional
+
+
+# pandas, numpy, plotly and requests cost most of a cold start, and the
+# logged-out page uses none of them. Each is imported on first attribute
+# access instead; the import system's module locks make that thread-safe.
+class LazyModule:
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            module = self._module = importlib.import_module(self._name)
+        return getattr(module, attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f'<lazy module {self._name!r} ({state})>'
+
+
+pd = LazyModule('pandas')
+np = LazyModule('numpy')
+px = LazyModule('plotly.express')
+requests = LazyModule('requests')
 
 load_dotenv()
 
@@ -62,10 +110,378 @@ DAILY_VERSES = [
     }
 ]
 
+METRICS_ENABLED = os.getenv('WORKZEN_METRICS', '1') != '0'
+METRICS_FILE = os.getenv('WORKZEN_METRICS_FILE')
+METRICS_FILE_INTERVAL = float(os.getenv('WORKZEN_METRICS_INTERVAL', 15))
+# Usernames are typed in freely, so the Metrics tab is unlocked by this shared
+# secret rather than by name. Unset, nobody sees it.
+ADMIN_TOKEN = os.getenv('WORKZEN_ADMIN_TOKEN', '')
+
+# Upper bounds in seconds; the last bucket catches everything slower.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+                   float('inf'))
+
+
+# Fixed-bucket latency histogram. Quantiles are interpolated inside the bucket
+# they fall in, which is as precise as the Prometheus histogram_quantile view.
+class Histogram:
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def snapshot(self) -> tuple:
+        with self._lock:
+            return list(self.counts), self.count, self.sum, self.max
+
+    def quantile(self, q: float) -> float:
+        counts, count, _, largest = self.snapshot()
+        return self._quantile(q, counts, count, largest)
+
+    def _quantile(self, q: float, counts: List[int], count: int, largest: float) -> float:
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = min(self.buckets[index], largest)
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return largest
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._writer = None
+
+    def histogram(self, name: str) -> Histogram:
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, Histogram())
+        return histogram
+
+    def summary(self) -> List[Dict]:
+        rows = []
+        for name, histogram in sorted(self._histograms.items()):
+            counts, count, total, largest = histogram.snapshot()
+            if not count:
+                continue
+            rows.append({
+                'operation': name,
+                'count': count,
+                'mean_ms': total / count * 1000,
+                'p50_ms': histogram._quantile(0.50, counts, count, largest) * 1000,
+                'p95_ms': histogram._quantile(0.95, counts, count, largest) * 1000,
+                'p99_ms': histogram._quantile(0.99, counts, count, largest) * 1000,
+                'max_ms': largest * 1000,
+            })
+        return rows
+
+    def to_prometheus(self) -> str:
+        lines = [
+            '# HELP workzen_latency_seconds Latency of WorkZen hot paths.',
+            '# TYPE workzen_latency_seconds histogram',
+        ]
+        for name, histogram in sorted(self._histograms.items()):
+            counts, count, total, _ = histogram.snapshot()
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets, counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'workzen_latency_seconds_bucket{{op="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'workzen_latency_seconds_sum{{op="{name}"}} {total!r}')
+            lines.append(f'workzen_latency_seconds_count{{op="{name}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path: str):
+        # Written beside the target and renamed so a scraper never reads half a file.
+        directory = os.path.dirname(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile('w', dir=directory, prefix='.workzen-metrics-', delete=False) as handle:
+            handle.write(self.to_prometheus())
+        os.replace(handle.name, path)
+
+    def start_textfile_writer(self, path: str, interval: float = METRICS_FILE_INTERVAL):
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.write_textfile(path)
+                except OSError:
+                    logging.exception('WorkZen could not write metrics to %s', path)
+        
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=run, name='workzen-metrics', daemon=True)
+                self._writer.start()
+                atexit.register(lambda: self.write_textfile(path))
+
+
+@st.cache_resource
+def get_metrics() -> MetricsRegistry:
+    registry = MetricsRegistry()
+    if METRICS_ENABLED and METRICS_FILE:
+        registry.start_textfile_writer(METRICS_FILE)
+    return registry
+
+# Looked up once per script run; the cache_resource lookup costs more than a
+# histogram observation.
+_metrics = get_metrics() if METRICS_ENABLED else None
+
+def observe(name: str, seconds: float):
+    if _metrics is not None:
+        _metrics.histogram(name).observe(seconds)
+
+def timed(name: Optional[str] = None):
+    # With metrics disabled the function is returned undecorated, so the only
+    # cost is paid once at definition time.
+    def decorate(fn):
+        if not METRICS_ENABLED:
+            return fn
+        histogram = _metrics.histogram(name or f'db.{fn.__name__}')
+        
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+_NO_TIMER = contextlib.nullcontext()
+
+@contextmanager
+def _timer(histogram: Histogram):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - start)
+
+def timer(name: str):
+    if not METRICS_ENABLED:
+        return _NO_TIMER
+    return _timer(_metrics.histogram(name))
+
+DB_PATH = os.getenv('WORKZEN_DB', 'workzen.db')
+
+
+# One pool per process (see get_db). Each connection is checked out by a single
+# thread at a time and keeps its prepared-statement cache between helper calls.
+class Database:
+    def __init__(self, path: str = DB_PATH, pool_size: int = 8, busy_timeout: float = 5.0,
+                 cached_statements: int = 256):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        # Only takes effect on a new, empty file; compact_database() converts
+        # older databases with a one-time VACUUM.
+        conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout * 1000)}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute('PRAGMA cache_size=-16000')
+        conn.execute('PRAGMA mmap_size=134217728')
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            # Nested use on the same thread shares the connection already held.
+            yield conn
+            return
+        
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+@st.cache_resource
+def get_db() -> Database:
+    db = Database(DB_PATH)
+    with db.connection() as conn:
+        migrate(conn)
+        ensure_search_index(conn)
+    return db
+
+def ensure_search_index(conn: sqlite3.Connection) -> bool:
+    # Catches up databases migrated on a SQLite build without FTS5.
+    if _search_index_exists(conn.cursor()):
+        return True
+    if not _fts5_available(conn.cursor()):
+        return False
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        if not _search_index_exists(conn.cursor()):
+            _create_search_index(conn.cursor())
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return True
+
+@timed()
 def init_database():
-    conn = sqlite3.connect('workzen.db')
-    cursor = conn.cursor()
-    
+    # Migrations run when the process-wide Database is first created, so on
+    # later reruns this is only a cache lookup.
+    get_db()
+
+def _utc_timestamp() -> str:
+    # Same layout as SQLite's CURRENT_TIMESTAMP so stored values sort as text.
+    return datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+def _iso_date(value) -> str:
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.strftime('%Y-%m-%d')
+    return str(value)
+
+ROLLUP_METRICS = ['morning_stress', 'evening_stress', 'workload_rating', 'energy_level']
+
+ROLLUP_TABLES = {
+    'day': 'stress_daily',
+    'week': 'stress_weekly',
+    'month': 'stress_monthly',
+}
+
+# Weeks start on Monday: step back six days, then forward to the next Monday.
+ROLLUP_PERIOD_SQL = {
+    'day': "date(date)",
+    'week': "date(date, '-6 days', 'weekday 1')",
+    'month': "date(date, 'start of month')",
+}
+
+def _rollup_period_start(day: datetime.date, grain: str) -> str:
+    if grain == 'week':
+        day = day - datetime.timedelta(days=day.weekday())
+    elif grain == 'month':
+        day = day.replace(day=1)
+    return day.isoformat()
+
+def _rollup_upsert_sql(table: str) -> str:
+    columns = ['user_id', 'period_start', 'checkins']
+    updates = ['checkins = checkins + excluded.checkins']
+    for metric in ROLLUP_METRICS:
+        columns += [f'{metric}_count', f'{metric}_sum', f'{metric}_min', f'{metric}_max']
+        updates += [
+            f'{metric}_count = {metric}_count + excluded.{metric}_count',
+            f'{metric}_sum = {metric}_sum + excluded.{metric}_sum',
+            f'{metric}_min = min(COALESCE({metric}_min, excluded.{metric}_min), '
+            f'COALESCE(excluded.{metric}_min, {metric}_min))',
+            f'{metric}_max = max(COALESCE({metric}_max, excluded.{metric}_max), '
+            f'COALESCE(excluded.{metric}_max, {metric}_max))',
+        ]
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+        f"ON CONFLICT (user_id, period_start) DO UPDATE SET {', '.join(updates)}"
+    )
+
+ROLLUP_UPSERT_SQL = {grain: _rollup_upsert_sql(table) for grain, table in ROLLUP_TABLES.items()}
+
+def _rollup_statements(user_id: int, stress_data: Dict) -> List[tuple]:
+    day = datetime.date.fromisoformat(_iso_date(stress_data['date']))
+    values = []
+    for metric in ROLLUP_METRICS:
+        value = stress_data.get(metric)
+        if value is None:
+            values += [0, 0, None, None]
+        else:
+            values += [1, value, value, value]
+    return [
+        (ROLLUP_UPSERT_SQL[grain], (user_id, _rollup_period_start(day, grain), 1, *values))
+        for grain in ROLLUP_TABLES
+    ]
+
+def _rebuild_rollups(cursor: sqlite3.Cursor, user_id: Optional[int] = None):
+    where = 'WHERE user_id = ?' if user_id is not None else ''
+    params = (user_id,) if user_id is not None else ()
+    for grain, table in ROLLUP_TABLES.items():
+        period = ROLLUP_PERIOD_SQL[grain]
+        columns = ['user_id', 'period_start', 'checkins']
+        selects = ['user_id', period, 'COUNT(*)']
+        for metric in ROLLUP_METRICS:
+            columns += [f'{metric}_count', f'{metric}_sum', f'{metric}_min', f'{metric}_max']
+            selects += [f'COUNT({metric})', f'COALESCE(SUM({metric}), 0)', f'MIN({metric})', f'MAX({metric})']
+        cursor.execute(f'DELETE FROM {table} {where}', params)
+        cursor.execute(f'''
+            INSERT INTO {table} ({', '.join(columns)})
+            SELECT {', '.join(selects)}
+            FROM stress_checkins
+            {where}
+            GROUP BY user_id, {period}
+        ''', params)
+
+# Full-text indexes over user-written text. Each is an external-content FTS5
+# table that mirrors its base table through triggers. user_id is indexed as a
+# token so a search can be limited to one user inside the MATCH itself.
+FTS_TABLES = {
+    'conversations_fts': ('conversations', ['message', 'response']),
+    'stress_notes_fts': ('stress_checkins', ['notes']),
+    'prayer_requests_fts': ('prayer_requests', ['request_text', 'answered_text']),
+}
+
+def _fts5_available(cursor: sqlite3.Cursor) -> bool:
+    try:
+        cursor.execute('CREATE VIRTUAL TABLE temp._fts5_probe USING fts5(x)')
+        cursor.execute('DROP TABLE temp._fts5_probe')
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+def _rebuild_search_index(cursor: sqlite3.Cursor):
+    for fts_table in FTS_TABLES:
+        cursor.execute(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')")
+
+def _migration_1_initial_schema(cursor: sqlite3.Cursor):
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS users (
             id INTEGER PRIMARY KEY,
@@ -112,211 +528,2859 @@ def init_database():
             FOREIGN KEY (user_id) REFERENCES users (id)
         )
     ''')
+
+def _migration_2_indexes(cursor: sqlite3.Cursor):
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_stress_checkins_user_date
+        ON stress_checkins (user_id, date)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_prayer_requests_user_created
+        ON prayer_requests (user_id, created_at)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_conversations_user_timestamp
+        ON conversations (user_id, timestamp)
+    ''')
+    
+    # Older rows were written through the sqlite3 datetime adapters, which
+    # store microseconds and a local-time answered_at. Normalize them to the
+    # 'YYYY-MM-DD[ HH:MM:SS]' layout so range scans on the new indexes compare
+    # like with like.
+    cursor.execute('''
+        UPDATE stress_checkins SET date = COALESCE(date(date), date)
+        WHERE date IS NOT NULL
+    ''')
+    cursor.execute('''
+        UPDATE prayer_requests
+        SET answered_at = COALESCE(strftime('%Y-%m-%d %H:%M:%S', answered_at), answered_at)
+        WHERE answered_at IS NOT NULL
+    ''')
+
+def _migration_3_response_cache(cursor: sqlite3.Cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS response_cache (
+            key TEXT PRIMARY KEY,
+            response TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            expires_at REAL NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_response_cache_expires
+        ON response_cache (expires_at)
+    ''')
+
+def _migration_4_conversation_summaries(cursor: sqlite3.Cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS conversation_summaries (
+            user_id INTEGER PRIMARY KEY,
+            summary TEXT NOT NULL DEFAULT '',
+            last_conversation_id INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+
+def _migration_5_stress_rollups(cursor: sqlite3.Cursor):
+    metric_columns = ''.join(
+        f'''
+            {metric}_count INTEGER NOT NULL DEFAULT 0,
+            {metric}_sum INTEGER NOT NULL DEFAULT 0,
+            {metric}_min INTEGER,
+            {metric}_max INTEGER,'''
+        for metric in ROLLUP_METRICS
+    )
+    for table in ROLLUP_TABLES.values():
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                user_id INTEGER NOT NULL,
+                period_start DATE NOT NULL,
+                checkins INTEGER NOT NULL DEFAULT 0,{metric_columns}
+                PRIMARY KEY (user_id, period_start)
+            ) WITHOUT ROWID
+        ''')
+    _rebuild_rollups(cursor)
+
+def _migration_6_prayer_filter_indexes(cursor: sqlite3.Cursor):
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_prayer_requests_user_category_created
+        ON prayer_requests (user_id, category, created_at)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_prayer_requests_user_answered_created
+        ON prayer_requests (user_id, is_answered, created_at)
+    ''')
+
+def _search_index_exists(cursor: sqlite3.Cursor) -> bool:
+    return cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'conversations_fts'"
+    ).fetchone() is not None
+
+def _migration_7_search_index(cursor: sqlite3.Cursor):
+    # Without FTS5 the step is still recorded; ensure_search_index() builds
+    # the index on a later start once SQLite supports it.
+    if not _fts5_available(cursor):
+        logging.warning('SQLite was built without FTS5; search will fall back to LIKE scans')
+        return
+    _create_search_index(cursor)
+
+def _create_search_index(cursor: sqlite3.Cursor):
+    for fts_table, (table, text_columns) in FTS_TABLES.items():
+        columns = ['user_id'] + text_columns
+        column_list = ', '.join(columns)
+        new_values = ', '.join(f'new.{column}' for column in columns)
+        old_values = ', '.join(f'old.{column}' for column in columns)
+        
+        cursor.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5(
+                {column_list},
+                content='{table}',
+                content_rowid='id',
+                tokenize='porter unicode61'
+            )
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts_table} (rowid, {column_list}) VALUES (new.id, {new_values});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts_table} ({fts_table}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE ON {table} BEGIN
+                INSERT INTO {fts_table} ({fts_table}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+                INSERT INTO {fts_table} (rowid, {column_list}) VALUES (new.id, {new_values});
+            END
+        ''')
     
-    conn.commit()
-    conn.close()
+    _rebuild_search_index(cursor)
+
+def _migration_8_crisis_flags(cursor: sqlite3.Cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS crisis_flags (
+            id INTEGER PRIMARY KEY,
+            source TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            user_id INTEGER,
+            phrase TEXT,
+            flagged_at TIMESTAMP,
+            UNIQUE (source, row_id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS crisis_scan_state (
+            source TEXT PRIMARY KEY,
+            last_id INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+
+def _migration_9_weekly_digests(cursor: sqlite3.Cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS weekly_digests (
+            user_id INTEGER NOT NULL,
+            week_start DATE NOT NULL,
+            summary TEXT NOT NULL,
+            encouragement TEXT NOT NULL,
+            source TEXT NOT NULL,
+            created_at TIMESTAMP,
+            PRIMARY KEY (user_id, week_start)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS digest_checkpoints (
+            week_start DATE PRIMARY KEY,
+            last_user_id INTEGER NOT NULL DEFAULT 0,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+    ''')
+
+def _migration_10_conversation_archive(cursor: sqlite3.Cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS conversation_archive (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            turns INTEGER NOT NULL,
+            codec TEXT NOT NULL,
+            raw_bytes INTEGER NOT NULL,
+            payload BLOB NOT NULL,
+            archived_at TIMESTAMP,
+            UNIQUE (user_id, month)
+        )
+    ''')
+
+# Bumped by writes that may run in another process (cli.py import and
+# rollup rebuilds), so the app's read cache can notice them.
+def _migration_11_user_data_versions(cursor: sqlite3.Cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_data_versions (
+            user_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+
+MIGRATIONS = [
+    (1, _migration_1_initial_schema),
+    (2, _migration_2_indexes),
+    (3, _migration_3_response_cache),
+    (4, _migration_4_conversation_summaries),
+    (5, _migration_5_stress_rollups),
+    (6, _migration_6_prayer_filter_indexes),
+    (7, _migration_7_search_index),
+    (8, _migration_8_crisis_flags),
+    (9, _migration_9_weekly_digests),
+    (10, _migration_10_conversation_archive),
+    (11, _migration_11_user_data_versions),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def migrate(conn: sqlite3.Connection) -> int:
+    if get_schema_version(conn) >= SCHEMA_VERSION:
+        return SCHEMA_VERSION
+    
+    for number, migration in MIGRATIONS:
+        # BEGIN IMMEDIATE takes the write lock up front, so when several
+        # processes start together only one of them applies each step.
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if get_schema_version(conn) < number:
+                migration(conn.cursor())
+                conn.execute(f'PRAGMA user_version = {number}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    
+    return get_schema_version(conn)
+
+# Inserts that do not need to block the UI thread are queued here and
+# committed by a background thread in batches, one transaction per batch.
+# A full queue pushes back on callers for up to put_timeout seconds and then
+# the write happens inline, once the user's queued writes have landed, so
+# nothing is dropped or reordered. Readers call sync(user_id)
+# first to see their own pending writes.
+class WriteBehindQueue:
+    _STOP = object()
+
+    def __init__(self, db: Database, max_pending: int = 1000, batch_size: int = 200,
+                 linger: float = 0.02, put_timeout: float = 2.0):
+        self.db = db
+        self.batch_size = batch_size
+        self.linger = linger
+        self.put_timeout = put_timeout
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._pending = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='workzen-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, user_id: int, sql: str, params: tuple):
+        self.submit_many(user_id, [(sql, params)])
+
+    def submit_many(self, user_id: int, statements: List[tuple]):
+        # The statements of one submission always land in the same transaction.
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('write queue is closed')
+            self._pending[user_id] = self._pending.get(user_id, 0) + 1
+        
+        item = (user_id, statements)
+        try:
+            self._queue.put(item, timeout=self.put_timeout)
+        except queue.Full:
+            # Wait for the writes this user queued earlier, or this one could
+            # commit ahead of them.
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending.get(user_id, 0) <= 1)
+            try:
+                self._write([item])
+            finally:
+                # Even a failed write must release the count, or sync() on
+                # this user waits forever.
+                self._done([item])
+
+    def sync(self, user_id: Optional[int] = None, timeout: Optional[float] = None) -> bool:
+        with self._cond:
+            if user_id is None:
+                return self._cond.wait_for(lambda: not self._pending, timeout)
+            return self._cond.wait_for(lambda: user_id not in self._pending, timeout)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        return self.sync(None, timeout)
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                return
+            
+            batch = [item]
+            deadline = time.monotonic() + self.linger
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            
+            try:
+                self._write(batch)
+            except Exception:
+                logging.exception('WorkZen write-behind batch failed; retrying row by row')
+                for single in batch:
+                    try:
+                        self._write([single])
+                    except Exception:
+                        logging.exception('WorkZen dropped a write for user %s', single[0])
+            self._done(batch)
+            
+            if stop:
+                return
+
+    def _write(self, batch: List[tuple]):
+        with self.db.connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Consecutive statements with the same SQL share one executemany.
+                statements = [statement for _, item_statements in batch for statement in item_statements]
+                for sql, group in itertools.groupby(statements, key=lambda statement: statement[0]):
+                    conn.executemany(sql, [params for _, params in group])
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def _done(self, batch: List[tuple]):
+        with self._cond:
+            for user_id, _ in batch:
+                remaining = self._pending.get(user_id, 0) - 1
+                if remaining > 0:
+                    self._pending[user_id] = remaining
+                else:
+                    self._pending.pop(user_id, None)
+            self._cond.notify_all()
+
+
+@st.cache_resource
+def get_writer() -> WriteBehindQueue:
+    return WriteBehindQueue(get_db())
+
+READ_CACHE_MAX_BYTES = int(os.getenv('WORKZEN_READ_CACHE_MB', 64)) * 1024 * 1024
+# Seconds between checks of a user's row in user_data_versions.
+READ_CACHE_EXTERNAL_CHECK = float(os.getenv('WORKZEN_EXTERNAL_WRITE_CHECK', 2))
+
+def _approx_size(value) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if hasattr(value, 'to_plotly_json'):
+        return len(value.to_json())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_approx_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_approx_size(k) + _approx_size(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+# Read results are cached per (query, user_id, args, data version). Writers
+# bump the user's version, so an entry is served until that user writes
+# again. Writes from other processes are picked up by polling the user's
+# user_data_versions row at most every READ_CACHE_EXTERNAL_CHECK seconds.
+# Entries from all sessions share one LRU capped at max_bytes.
+class ReadCache:
+    def __init__(self, max_bytes: int = READ_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._user_keys = {}
+        self._versions = {}
+        self._external = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def version(self, user_id: int) -> int:
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def bump(self, user_id: int):
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            for key in self._user_keys.pop(user_id, ()):
+                self._evict(key)
+
+    def check_external(self, user_id: int, load_version):
+        now = time.monotonic()
+        with self._lock:
+            seen = self._external.get(user_id)
+            if seen is not None and now - seen[1] < READ_CACHE_EXTERNAL_CHECK:
+                return
+        version = load_version()
+        with self._lock:
+            seen = self._external.get(user_id)
+            self._external[user_id] = (version, now)
+        if seen is not None and seen[0] != version:
+            self.bump(user_id)
+
+    def clear(self):
+        with self._lock:
+            for user_id in list(self._user_keys):
+                self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._entries.clear()
+            self._user_keys.clear()
+            self._bytes = 0
+
+    def _evict(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+            keys = self._user_keys.get(key[1])
+            if keys is not None:
+                keys.discard(key)
+
+    def get_or_load(self, user_id: int, name: str, args: tuple, loader):
+        with self._lock:
+            version = self._versions.get(user_id, 0)
+            key = (name, user_id, args, version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        
+        value = loader()
+        size = _approx_size(value)
+        
+        with self._lock:
+            # A write that landed while loading makes this result stale.
+            if self._versions.get(user_id, 0) != version or size > self.max_bytes:
+                return value
+            self._evict(key)
+            self._entries[key] = (value, size)
+            self._user_keys.setdefault(user_id, set()).add(key)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._evict(oldest)
+                self.evictions += 1
+        return value
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
+
+
+@st.cache_resource
+def get_read_cache() -> ReadCache:
+    return ReadCache()
+
+def _bump_data_version(conn: sqlite3.Connection, user_id: Optional[int] = None):
+    if user_id is None:
+        conn.execute('''
+            INSERT INTO user_data_versions (user_id, version) SELECT id, 1 FROM users WHERE true
+            ON CONFLICT (user_id) DO UPDATE SET version = version + 1
+        ''')
+    else:
+        conn.execute('''
+            INSERT INTO user_data_versions (user_id, version) VALUES (?, 1)
+            ON CONFLICT (user_id) DO UPDATE SET version = version + 1
+        ''', (user_id,))
+
+def _load_data_version(user_id: int) -> int:
+    with get_db().connection() as conn:
+        row = conn.execute('SELECT version FROM user_data_versions WHERE user_id = ?', (user_id,)).fetchone()
+    return row[0] if row else 0
+
+def cached_per_user(fn):
+    # Caches a read helper whose first argument is user_id. Results are
+    # shared objects: callers must not mutate them in place.
+    @functools.wraps(fn)
+    def wrapper(user_id: int, *args, **kwargs):
+        key_args = args + tuple(sorted(kwargs.items()))
+        get_read_cache().check_external(user_id, lambda: _load_data_version(user_id))
+        return get_read_cache().get_or_load(user_id, fn.__name__, key_args, lambda: fn(user_id, *args, **kwargs))
+    return wrapper
 
 def get_daily_verse():
     day_of_year = datetime.datetime.now().timetuple().tm_yday
     return DAILY_VERSES[day_of_year % len(DAILY_VERSES)]
 
-def get_ai_response(user_message: str, context: Dict) -> str:
-    api_key = os.getenv('MISTRAL_API_KEY')
-    
-    if not api_key:
-        return "I'm having trouble connecting right now. Please try again in a moment."
-    
-    crisis_keywords = ["suicide", "kill myself", "hopeless", "can't go on", "hurt myself", "end it all"]
-    if any(keyword in user_message.lower() for keyword in crisis_keywords):
-        return """I'm deeply concerned about what you're sharing. Please know that God loves you and your life has immense value. Please reach out for immediate support:
+# Retrieval-only library: the daily rotation above plus verses quoted from the
+# World English Bible (public domain). WORKZEN_VERSES may name a JSON file with
+# more entries of the same shape.
+VERSE_LIBRARY = DAILY_VERSES + [
+    {
+        "verse": "Colossians 3:23-24",
+        "text": "And whatever you do, work heartily, as for the Lord, and not for men, knowing that from the Lord you will receive the reward of the inheritance; for you serve the Lord Christ.",
+        "theme": "Purpose in Work",
+        "application": "When your job feels thankless or your boss never notices, remember that every task is done for Christ, who sees your effort."
+    },
+    {
+        "verse": "Proverbs 16:3",
+        "text": "Commit your deeds to the LORD, and your plans shall succeed.",
+        "theme": "Planning and Projects",
+        "application": "Before planning a big project, deadline or career move, pray over the plan and hold the outcome loosely."
+    },
+    {
+        "verse": "Matthew 6:34",
+        "text": "Therefore don't be anxious for tomorrow, for tomorrow will be anxious for itself. Each day's own evil is sufficient.",
+        "theme": "Worry About Tomorrow",
+        "application": "When tomorrow's meetings, deadlines and to-do list keep you up worrying, focus on faithfulness in today's work."
+    },
+    {
+        "verse": "John 14:27",
+        "text": "Peace I leave with you. My peace I give to you; not as the world gives, I give to you. Don't let your heart be troubled, neither let it be fearful.",
+        "theme": "Peace in Turmoil",
+        "application": "When the office is tense and fear takes hold, receive the peace Christ offers that does not depend on circumstances."
+    },
+    {
+        "verse": "Psalm 55:22",
+        "text": "Cast your burden on the LORD, and he will sustain you. He will never allow the righteous to be moved.",
+        "theme": "Heavy Burdens",
+        "application": "Name the heavy load you are carrying at work, a difficult project or a struggling team, and hand it to God in prayer."
+    },
+    {
+        "verse": "Isaiah 41:10",
+        "text": "Don't you be afraid, for I am with you. Don't be dismayed, for I am your God. I will strengthen you. Yes, I will help you. Yes, I will uphold you with the right hand of my righteousness.",
+        "theme": "Fear and Courage",
+        "application": "Facing a layoff, a hard review or a scary presentation? God promises to strengthen and hold you up."
+    },
+    {
+        "verse": "Galatians 6:9",
+        "text": "Let's not be weary in doing good, for we will reap in due season, if we don't give up.",
+        "theme": "Perseverance",
+        "application": "When you are tired of doing the right thing and see no reward or promotion yet, keep going; the harvest comes in season."
+    },
+    {
+        "verse": "James 1:5",
+        "text": "But if any of you lacks wisdom, let him ask of God, who gives to all liberally and without reproach; and it will be given to him.",
+        "theme": "Wisdom for Decisions",
+        "application": "Stuck on a hard decision, a job offer or a difficult problem at work? Ask God for wisdom; he gives it generously."
+    },
+    {
+        "verse": "Proverbs 3:5-6",
+        "text": "Trust in the LORD with all your heart, and don't lean on your own understanding. In all your ways acknowledge him, and he will make your paths straight.",
+        "theme": "Trust and Direction",
+        "application": "When your career path is unclear or a change at work makes no sense, trust God to direct your steps."
+    },
+    {
+        "verse": "Romans 12:18",
+        "text": "If it is possible, as much as it is up to you, be at peace with all men.",
+        "theme": "Workplace Conflict",
+        "application": "In conflict with a coworker or manager, do your part to make peace even if they do not respond in kind."
+    },
+    {
+        "verse": "Ephesians 4:26",
+        "text": "\"Be angry, and don't sin.\" Don't let the sun go down on your wrath.",
+        "theme": "Anger and Frustration",
+        "application": "Frustrated or angry with a colleague or boss? Feel it honestly, but deal with it before the day ends instead of letting it fester."
+    },
+    {
+        "verse": "James 1:19",
+        "text": "So, then, my beloved brothers, let every man be swift to hear, slow to speak, and slow to anger.",
+        "theme": "Difficult Conversations",
+        "application": "Before a tense meeting or hard conversation with your team, commit to listening first and speaking slowly."
+    },
+    {
+        "verse": "Proverbs 15:1",
+        "text": "A gentle answer turns away wrath, but a harsh word stirs up anger.",
+        "theme": "Gentle Words",
+        "application": "When an email or a coworker makes you angry, answer gently; a calm reply can defuse a heated conflict."
+    },
+    {
+        "verse": "Mark 6:31",
+        "text": "He said to them, \"You come apart into a deserted place, and rest awhile.\" For there were many coming and going, and they had no leisure so much as to eat.",
+        "theme": "Rest From Busyness",
+        "application": "If you are so busy you skip lunch and breaks, Jesus invites you to step away and rest; burnout is not a badge of honor."
+    },
+    {
+        "verse": "Psalm 127:2",
+        "text": "It is vain for you to rise up early, to stay up late, eating the bread of toil, for he gives sleep to his loved ones.",
+        "theme": "Overwork and Sleep",
+        "application": "Long hours, overtime and late nights will not secure your future; trust God enough to rest and sleep."
+    },
+    {
+        "verse": "Exodus 33:14",
+        "text": "He said, \"My presence will go with you, and I will give you rest.\"",
+        "theme": "God's Presence",
+        "application": "Whether you commute to the office or work remote and alone, God's presence goes with you into every workday."
+    },
+    {
+        "verse": "Ecclesiastes 4:6",
+        "text": "Better is a handful, with quietness, than two handfuls with labor and chasing after wind.",
+        "theme": "Contentment and Ambition",
+        "application": "When ambition, salary and the next promotion drive you to exhaustion, remember that quiet contentment is worth more."
+    },
+    {
+        "verse": "Hebrews 13:5",
+        "text": "Be free from the love of money, content with such things as you have, for he has said, \"I will in no way leave you, neither will I in any way forsake you.\"",
+        "theme": "Money and Security",
+        "application": "Worried about pay, bills or job security? God promises never to leave you, whatever your finances."
+    },
+    {
+        "verse": "Philippians 4:19",
+        "text": "My God will supply every need of yours according to his riches in glory in Christ Jesus.",
+        "theme": "Provision",
+        "application": "During a job search, a layoff or financial strain, trust that God knows and will meet your real needs."
+    },
+    {
+        "verse": "Matthew 6:33",
+        "text": "But seek first God's Kingdom and his righteousness; and all these things will be given to you as well.",
+        "theme": "Priorities",
+        "application": "When work crowds out family, faith and rest, reorder your priorities around God's kingdom first."
+    },
+    {
+        "verse": "Romans 8:28",
+        "text": "We know that all things work together for good for those who love God, for those who are called according to his purpose.",
+        "theme": "Setbacks and Failure",
+        "application": "A failed project, a missed promotion or a mistake at work is not the end; God can work it for good."
+    },
+    {
+        "verse": "Psalm 34:18",
+        "text": "The LORD is near to those who have a broken heart, and saves those who have a crushed spirit.",
+        "theme": "Discouragement",
+        "application": "If work has left you discouraged, hurt or crushed, God is especially near to you right now."
+    },
+    {
+        "verse": "2 Timothy 1:7",
+        "text": "For God didn't give us a spirit of fear, but of power, love, and self-control.",
+        "theme": "Confidence",
+        "application": "Nervous about speaking up, a presentation or an interview? God's Spirit gives power, love and a sound mind, not fear."
+    },
+    {
+        "verse": "Joshua 1:9",
+        "text": "Haven't I commanded you? Be strong and courageous. Don't be afraid. Don't be dismayed, for the LORD your God is with you wherever you go.",
+        "theme": "New Challenges",
+        "application": "Starting a new job, role or team? Be strong and courageous; God goes with you into the unknown."
+    },
+    {
+        "verse": "Psalm 46:10",
+        "text": "Be still, and know that I am God. I will be exalted among the nations. I will be exalted in the earth.",
+        "theme": "Stillness",
+        "application": "Between meetings and notifications, take a minute of silence to be still and remember who is in control."
+    },
+    {
+        "verse": "Lamentations 3:22-23",
+        "text": "It is because of the LORD's loving kindnesses that we are not consumed, because his mercies don't fail. They are new every morning. Great is your faithfulness.",
+        "theme": "Fresh Start",
+        "application": "After a terrible day at work, tomorrow morning brings new mercy and a fresh start."
+    },
+    {
+        "verse": "Psalm 90:17",
+        "text": "Let the favor of the Lord our God be on us. Establish the work of our hands for us. Yes, establish the work of our hands.",
+        "theme": "Blessing on Work",
+        "application": "Ask God to bless and establish the work of your hands today, from small tasks to big projects."
+    },
+    {
+        "verse": "Proverbs 22:29",
+        "text": "Do you see a man skilled in his work? He will serve kings. He won't serve obscure men.",
+        "theme": "Excellence and Skill",
+        "application": "Growing your skills and doing excellent work honors God, even when career progress feels slow."
+    },
+    {
+        "verse": "1 Corinthians 15:58",
+        "text": "Therefore, my beloved brothers, be steadfast, immovable, always abounding in the Lord's work, because you know that your labor is not in vain in the Lord.",
+        "theme": "Meaningful Labor",
+        "application": "When your work feels pointless or meaningless, remember your labor in the Lord is never in vain."
+    },
+    {
+        "verse": "Ephesians 4:32",
+        "text": "And be kind to one another, tender hearted, forgiving each other, just as God also in Christ forgave you.",
+        "theme": "Kindness and Forgiveness",
+        "application": "Forgive the coworker or boss who hurt or offended you, as Christ forgave you, and choose kindness."
+    },
+    {
+        "verse": "Colossians 3:13",
+        "text": "Bearing with one another, and forgiving each other, if any man has a complaint against any; even as Christ forgave you, so you also do.",
+        "theme": "Difficult People",
+        "application": "Patience with difficult, critical or unfair colleagues grows as you remember how much you have been forgiven."
+    },
+    {
+        "verse": "Psalm 4:8",
+        "text": "In peace I will both lay myself down and sleep, for you, LORD alone, make me live in safety.",
+        "theme": "Sleep and Insomnia",
+        "application": "If work stress keeps you awake at night, pray this verse and leave tomorrow's problems with God."
+    },
+    {
+        "verse": "Isaiah 26:3",
+        "text": "You will keep whoever's mind is steadfast in perfect peace, because he trusts in you.",
+        "theme": "Focused Mind",
+        "application": "When racing thoughts and anxiety scatter your focus, fix your mind on God and receive his perfect peace."
+    },
+    {
+        "verse": "Romans 15:13",
+        "text": "Now may the God of hope fill you with all joy and peace in believing, that you may abound in hope, in the power of the Holy Spirit.",
+        "theme": "Hope and Joy",
+        "application": "When work drains your joy and hope, ask the Holy Spirit to refill you as you trust him."
+    },
+    {
+        "verse": "2 Corinthians 4:8-9",
+        "text": "We are pressed on every side, yet not crushed; perplexed, yet not to despair; pursued, yet not forsaken; struck down, yet not destroyed.",
+        "theme": "Pressure and Resilience",
+        "application": "Pressure from every side at work, deadlines, demands and criticism, does not have to crush you."
+    },
+    {
+        "verse": "Micah 6:8",
+        "text": "He has shown you, O man, what is good. What does the LORD require of you, but to act justly, to love mercy, and to walk humbly with your God?",
+        "theme": "Integrity at Work",
+        "application": "Pressured to cut corners or act unfairly? Choose justice, mercy and humility even when it costs you."
+    },
+    {
+        "verse": "Proverbs 12:25",
+        "text": "Anxiety in a man's heart weighs it down, but a kind word makes it glad.",
+        "theme": "Encouragement",
+        "application": "Anxiety weighs heavy; share it with someone you trust, and offer a kind word to a stressed colleague today."
+    },
+    {
+        "verse": "Galatians 6:2",
+        "text": "Bear one another's burdens, and so fulfill the law of Christ.",
+        "theme": "Supporting Others",
+        "application": "Notice a teammate who is overwhelmed and help carry their load; you were not meant to carry yours alone either."
+    },
+    {
+        "verse": "Psalm 121:1-2",
+        "text": "I will lift up my eyes to the hills. Where does my help come from? My help comes from the LORD, who made heaven and earth.",
+        "theme": "Help in Trouble",
+        "application": "When you feel you have nowhere to turn at work, look up; your help comes from the Maker of heaven and earth."
+    },
+]
+
+VERSE_TOKEN_PATTERN = re.compile(r"[a-z]+")
+
+VERSE_STOPWORDS = frozenset(
+    "a about after again all also am an and any are as at be been but by can could did do does don for from had "
+    "has have he her him his how i if in into is it its just let me more much my no not of on or our out over "
+    "really so than that the their them then there they this to too up us very was we were what when which who "
+    "why will with would you your yours".split()
+)
+
+def _verse_tokens(text: str) -> List[str]:
+    tokens = []
+    for word in VERSE_TOKEN_PATTERN.findall(text.lower()):
+        if word in VERSE_STOPWORDS or len(word) < 3:
+            continue
+        # Light suffix stripping so "deadlines", "worrying" and "worried"
+        # meet "deadline" and "worry" in the index.
+        for suffix in ('ing', 'ied', 'ies', 'ed', 'es', 's'):
+            if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+                word = word[:-len(suffix)] + ('y' if suffix in ('ied', 'ies') else '')
+                break
+        tokens.append(word)
+    return tokens
+
+def load_verse_library() -> List[Dict]:
+    verses = list(VERSE_LIBRARY)
+    extra_path = os.getenv('WORKZEN_VERSES')
+    if extra_path and os.path.exists(extra_path):
+        with open(extra_path, encoding='utf-8') as f:
+            verses += json.load(f)
+    return verses
+
+
+# Okapi BM25 over each verse's text, theme and application. The per-term,
+# per-verse weights are computed once into a term-major matrix, so scoring a
+# message is one row gather and a column sum; there is nothing to normalize
+# at query time.
+class VerseIndex:
+    def __init__(self, verses: List[Dict], k1: float = 1.2, b: float = 0.75):
+        self.verses = verses
+        documents = [
+            _verse_tokens(f"{verse['text']} {verse['theme']} {verse['theme']} {verse['application']}")
+            for verse in verses
+        ]
+        self.vocabulary = {}
+        for tokens in documents:
+            for token in tokens:
+                self.vocabulary.setdefault(token, len(self.vocabulary))
+        
+        counts = np.zeros((len(verses), len(self.vocabulary)), dtype=np.float32)
+        for row, tokens in enumerate(documents):
+            for token in tokens:
+                counts[row, self.vocabulary[token]] += 1
+        
+        lengths = counts.sum(axis=1, keepdims=True)
+        document_frequency = (counts > 0).sum(axis=0)
+        idf = np.log1p((len(verses) - document_frequency + 0.5) / (document_frequency + 0.5))
+        saturation = counts * (k1 + 1) / (counts + k1 * (1 - b + b * lengths / lengths.mean()))
+        self.weights = np.ascontiguousarray((saturation * idf).T, dtype=np.float32)
+
+    def search(self, query: str, k: int = 3, min_score: float = 0.0) -> List[tuple]:
+        columns = {self.vocabulary[token] for token in _verse_tokens(query) if token in self.vocabulary}
+        if not columns:
+            return []
+        scores = self.weights[list(columns)].sum(axis=0)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.verses[i], float(scores[i])) for i in top if scores[i] > min_score]
+
+
+@st.cache_resource
+def get_verse_index() -> VerseIndex:
+    return VerseIndex(load_verse_library())
+
+VERSE_PROMPT_MATCHES = 2
+
+def find_relevant_verses(user_message: str, k: int = VERSE_PROMPT_MATCHES) -> List[Dict]:
+    return [verse for verse, _ in get_verse_index().search(user_message, k)]
+
+LOCAL_FALLBACK_INTRO = "I can't reach my full assistant right now, but here is a word from Scripture for what you shared:"
+
+def local_fallback_response(user_message: str) -> str:
+    # Built only from the verse library, so it works with no API key, while
+    # the API is down and while the circuit breaker is open.
+    verses = find_relevant_verses(user_message) or [get_daily_verse()]
+    verse = verses[0]
+    response = (
+        f"{LOCAL_FALLBACK_INTRO}\n\n"
+        f"**{verse['verse']}** ({verse['theme']})\n\n"
+        f"*\"{verse['text']}\"*\n\n"
+        f"{verse['application']}"
+    )
+    if len(verses) > 1:
+        response += f"\n\nYou might also read **{verses[1]['verse']}**."
+    response += "\n\nWould you like to take a moment to pray about this, or tell me more about what's going on?"
+    return response
+
+MISTRAL_API_URL = os.getenv('MISTRAL_API_URL', 'https://api.mistral.ai/v1/chat/completions')
+MISTRAL_MODEL = "mistral-small-latest"
+
+CONNECTION_ERROR_RESPONSE = "I'm having trouble connecting right now. Please try again in a moment."
+
+CRISIS_RESPONSE = """I'm deeply concerned about what you're sharing. Please know that God loves you and your life has immense value. Please reach out for immediate support:
+
+🆘 **Crisis Resources:**
+- 988 Suicide & Crisis Lifeline: Call or text 988
+- Crisis Text Line: Text HOME to 741741
+- SAMHSA Helpline: 1-800-662-4357
+
+**Christian Crisis Support:**
+- Focus on the Family: 1-800-A-FAMILY
+- New Life Ministries: 1-800-NEW-LIFE
+
+**Remember God's Truth:**
+"For I know the plans I have for you," declares the Lord, "plans to prosper you and not to harm you, to give you hope and a future." - Jeremiah 29:11
+
+Please also connect with your pastor, a Christian counselor, or a trusted believer. You are not alone, and God has a purpose for your life."""
+
+CRISIS_LEXICON = [
+    "suicide",
+    "suicidal",
+    "kill myself",
+    "hopeless",
+    "hopelessness",
+    "can't go on",
+    "hurt myself",
+    "end it all",
+    "end my life",
+    "take my own life",
+    "want to die",
+    "better off dead",
+    "no reason to live",
+    "self harm",
+]
+
+# Spelling variants for whole tokens. The first word of a multi-word phrase
+# also accepts simple inflections, so "kill myself" matches "killing myself".
+CRISIS_TOKEN_VARIANTS = {
+    "can't": [("can't",), ("cant",), ("cannot",), ("can", "not")],
+    "myself": [("myself",), ("my", "self")],
+}
+
+# Apostrophes only count inside a word, so quoting a phrase ('hopeless')
+# does not glue the quote marks onto its first and last tokens.
+CRISIS_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z0-9]+)*")
+
+def load_crisis_lexicon() -> List[str]:
+    phrases = list(CRISIS_LEXICON)
+    extra_path = os.getenv('WORKZEN_CRISIS_LEXICON')
+    if extra_path and os.path.exists(extra_path):
+        with open(extra_path, encoding='utf-8') as f:
+            phrases += [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    return phrases
+
+def _inflections(word: str) -> List[str]:
+    forms = [word, word + 's', word + 'ed', word + 'ing']
+    if word.endswith('e'):
+        forms += [word + 'd', word[:-1] + 'ing']
+    return forms
+
+
+# Phrases are expanded into token sequences and indexed by their first
+# token, which works like a word-level Aho-Corasick automaton: text is
+# tokenized once, a set test rejects the common no-match case in C, and
+# only tokens that can start a phrase are checked further. Matching on
+# whole tokens gives word boundaries for free.
+class CrisisDetector:
+    def __init__(self, phrases: List[str]):
+        self.phrases = sorted({' '.join(phrase.lower().split()) for phrase in phrases if phrase.strip()})
+        self._index = {}
+        for phrase in self.phrases:
+            for sequence in self._expand(phrase):
+                self._index.setdefault(sequence[0], []).append(sequence[1:])
+        for continuations in self._index.values():
+            continuations.sort(key=len, reverse=True)
+        self._first_tokens = frozenset(self._index)
+
+    @staticmethod
+    def _expand(phrase: str) -> List[tuple]:
+        tokens = CRISIS_TOKEN_PATTERN.findall(phrase.replace('-', ' '))
+        sequences = [()]
+        for i, token in enumerate(tokens):
+            if token in CRISIS_TOKEN_VARIANTS:
+                options = CRISIS_TOKEN_VARIANTS[token]
+            elif i == 0 and len(tokens) > 1:
+                options = [(form,) for form in _inflections(token)]
+            else:
+                options = [(token,)]
+            sequences = [sequence + option for sequence in sequences for option in options]
+        return sequences
+
+    def _tokens(self, text: str) -> List[str]:
+        return CRISIS_TOKEN_PATTERN.findall(text.lower().replace('’', "'").replace('‘', "'"))
+
+    def matches(self, text: Optional[str]) -> List[str]:
+        if not text:
+            return []
+        tokens = self._tokens(text)
+        if self._first_tokens.isdisjoint(tokens):
+            return []
+        
+        found = []
+        for i, token in enumerate(tokens):
+            for rest in self._index.get(token, ()):
+                if tuple(tokens[i + 1:i + 1 + len(rest)]) == rest:
+                    found.append(' '.join((token,) + rest))
+                    break
+        return found
+
+    def is_crisis(self, text: Optional[str]) -> bool:
+        return bool(self.matches(text))
+
+
+@st.cache_resource
+def get_crisis_detector() -> CrisisDetector:
+    return CrisisDetector(load_crisis_lexicon())
+
+def _is_crisis_message(user_message: str) -> bool:
+    return get_crisis_detector().is_crisis(user_message)
+
+def _build_system_prompt(context: Dict) -> str:
+    system_prompt = """You are WorkZen, a Christian workplace stress assistant. You provide:
+
+1. Biblical encouragement and wisdom for workplace challenges
+2. Practical stress management techniques grounded in Christian faith
+3. Prayer support and spiritual guidance
+4. Compassionate listening and validation
+
+Guidelines:
+- Always integrate biblical wisdom naturally, not forced
+- Include relevant Bible verses when appropriate
+- Provide practical, actionable advice
+- Be warm, encouraging, and empathetic
+- Keep responses under 300 words
+- End with a question to continue the conversation
+
+Current context:"""
+    
+    if context.get('recent_stress_level'):
+        system_prompt += f"\n- User's recent stress level: {context['recent_stress_level']}/10"
+    
+    if context.get('time_of_day'):
+        hour = datetime.datetime.now().hour
+        if hour < 10:
+            system_prompt += "\n- Morning - focus on starting the day with God"
+        elif hour > 17:
+            system_prompt += "\n- Evening - focus on reflection and rest"
+    
+    return system_prompt
+
+CONTEXT_TOKEN_BUDGET = 1500
+SUMMARY_TOKEN_BUDGET = 300
+SUMMARY_RECENT_TURNS = 6
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English text; good enough to
+    # keep the prompt size bounded without shipping a tokenizer.
+    return len(text) // 4 + 1
+
+def _history_turns(context: Dict) -> List[Dict]:
+    # The UI's welcome message is greeting boilerplate, not conversation.
+    return [
+        turn for turn in context.get('history') or []
+        if turn.get('role') in ('user', 'assistant') and not turn.get('welcome')
+    ]
+
+def build_chat_messages(user_message: str, context: Dict) -> List[Dict]:
+    system_prompt = _build_system_prompt(context)
+    
+    summary = context.get('summary')
+    if summary is None and context.get('user_id'):
+        summary = get_conversation_summary(context['user_id'])
+    if summary:
+        system_prompt += f"\n- Summary of earlier conversations:\n{summary}"
+    
+    verses = context.get('verses')
+    if verses is None:
+        verses = find_relevant_verses(user_message)
+    if verses:
+        system_prompt += "\n- Scripture that may speak to this message (quote only if it fits):"
+        for verse in verses:
+            system_prompt += f"\n  {verse['verse']}: \"{verse['text']}\""
+    
+    budget = CONTEXT_TOKEN_BUDGET - estimate_tokens(system_prompt) - estimate_tokens(user_message)
+    recent = []
+    for turn in reversed(_history_turns(context)):
+        cost = estimate_tokens(turn['content'])
+        if cost > budget:
+            break
+        budget -= cost
+        recent.append({"role": turn['role'], "content": turn['content']})
+    recent.reverse()
+    
+    return (
+        [{"role": "system", "content": system_prompt}]
+        + recent
+        + [{"role": "user", "content": user_message}]
+    )
+
+def _build_request(api_key: str, messages: List[Dict], stream: bool = False):
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+    
+    payload = {
+        "model": MISTRAL_MODEL,
+        "messages": messages,
+        "max_tokens": 400,
+        "temperature": 0.7
+    }
+    if stream:
+        payload["stream"] = True
+    
+    return headers, payload
+
+def _error_response(status_code: int) -> str:
+    if status_code == 401:
+        return "I'm having authentication issues with my API. Please check that your API key is valid."
+    elif status_code == 429:
+        return "I'm getting too many requests right now. Please wait a moment and try again."
+    else:
+        return f"I'm experiencing some technical difficulties (Error {status_code}). Please try again in a moment."
+
+class CircuitOpenError(Exception):
+    pass
+
+
+# Closed: calls flow normally. Open: calls fail fast until reset_timeout has
+# passed. Half-open: a single trial call decides whether to close or re-open.
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+                self._trial_in_flight = False
+            if self.state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+
+def _timed_pool_class(pool_cls):
+    class TimedConnection(pool_cls.ConnectionCls):
+        def connect(self):
+            start = time.perf_counter()
+            try:
+                return super().connect()
+            finally:
+                observe('ai.connect', time.perf_counter() - start)
+    return type(f'Timed{pool_cls.__name__}', (pool_cls,), {'ConnectionCls': TimedConnection})
+
+
+# Records TCP connect plus TLS handshake for every new keep-alive connection;
+# requests served on a reused connection record nothing here.
+def _time_new_connections(poolmanager):
+    poolmanager.pool_classes_by_scheme = {
+        scheme: _timed_pool_class(pool_cls)
+        for scheme, pool_cls in poolmanager.pool_classes_by_scheme.items()
+    }
+
+
+class MistralClient:
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, url: str = MISTRAL_API_URL, pool_maxsize: int = 16, max_retries: int = 3,
+                 backoff_base: float = 0.5, backoff_max: float = 8.0, timeout=(5, 30),
+                 breaker: Optional[CircuitBreaker] = None):
+        self.url = url
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        
+        # Keep-alive connections are reused across chat turns; retries are
+        # handled below so they can honor Retry-After and feed the breaker.
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=0)
+        if METRICS_ENABLED:
+            _time_new_connections(adapter.poolmanager)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _retry_after(self, response) -> Optional[float]:
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, (retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+    def post(self, headers: Dict, payload: Dict, stream: bool = False) -> requests.Response:
+        if not self.breaker.allow():
+            raise CircuitOpenError(self.url)
+        
+        attempt = 0
+        while True:
+            try:
+                response = self.session.post(self.url, headers=headers, json=payload,
+                                             stream=stream, timeout=self.timeout)
+            except requests.RequestException:
+                if attempt >= self.max_retries:
+                    self.breaker.record_failure()
+                    raise
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+            
+            # elapsed stops when the response headers have been parsed, before
+            # any of the body is read, so it is the time to first byte.
+            observe('ai.ttfb', response.elapsed.total_seconds())
+            if response.status_code not in self.RETRY_STATUSES:
+                self.breaker.record_success()
+                return response
+            
+            delay = self._retry_after(response)
+            if delay is None:
+                delay = self._backoff(attempt)
+            if attempt >= self.max_retries or delay > self.backoff_max:
+                self.breaker.record_failure()
+                return response
+            
+            response.close()
+            time.sleep(delay)
+            attempt += 1
+
+
+@st.cache_resource
+def get_mistral_client() -> MistralClient:
+    return MistralClient(MISTRAL_API_URL)
+
+RESPONSE_CACHE_TTL = int(os.getenv('WORKZEN_RESPONSE_CACHE_TTL', 12 * 3600))
+
+
+# In-memory LRU in front of the response_cache table. Entries expire after
+# ttl seconds; the memory tier is capped by total text size and the table by
+# row count, evicting the entries closest to expiry first.
+class ResponseCache:
+    def __init__(self, db: Database, ttl: int = RESPONSE_CACHE_TTL, max_memory_bytes: int = 4 * 1024 * 1024,
+                 max_rows: int = 20000):
+        self.db = db
+        self.ttl = ttl
+        self.max_memory_bytes = max_memory_bytes
+        self.max_rows = max_rows
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._memory_bytes = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(user_message: str) -> str:
+        return ' '.join(re.sub(r"[^\w\s]", '', user_message.lower()).split())
+
+    @classmethod
+    def make_key(cls, system_prompt: str, user_message: str) -> str:
+        # Only turns without history are cached, keyed on the full system
+        # prompt as sent, summary included, so a reply drawn from one user's
+        # earlier conversations is never served to anyone else.
+        raw = json.dumps([system_prompt, cls.normalize(user_message)])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _remember(self, key: str, response: str, expires_at: float):
+        if key in self._entries:
+            self._memory_bytes -= len(self._entries.pop(key)[0])
+        self._entries[key] = (response, expires_at)
+        self._memory_bytes += len(response)
+        while self._memory_bytes > self.max_memory_bytes and self._entries:
+            _, (old_response, _) = self._entries.popitem(last=False)
+            self._memory_bytes -= len(old_response)
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+        
+        with self.db.connection() as conn:
+            row = conn.execute(
+                'SELECT response, expires_at FROM response_cache WHERE key = ? AND expires_at > ?',
+                (key, now)
+            ).fetchone()
+        
+        with self._lock:
+            if row:
+                self._remember(key, row[0], row[1])
+                self.hits += 1
+                return row[0]
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+    def put(self, key: str, response: str):
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._remember(key, response, expires_at)
+            self._writes += 1
+            prune = self._writes % 100 == 0
+        
+        with self.db.connection() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO response_cache (key, response, created_at, expires_at)
+                VALUES (?, ?, ?, ?)
+            ''', (key, response, now, expires_at))
+            if prune:
+                conn.execute('DELETE FROM response_cache WHERE expires_at <= ?', (now,))
+                conn.execute('''
+                    DELETE FROM response_cache WHERE key IN (
+                        SELECT key FROM response_cache ORDER BY expires_at
+                        LIMIT max(0, (SELECT COUNT(*) FROM response_cache) - ?)
+                    )
+                ''', (self.max_rows,))
+            conn.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'memory_entries': len(self._entries),
+                'memory_bytes': self._memory_bytes,
+            }
+
+
+@st.cache_resource
+def get_response_cache() -> ResponseCache:
+    return ResponseCache(get_db())
+
+AI_GLOBAL_PER_MINUTE = float(os.getenv('WORKZEN_AI_GLOBAL_PER_MINUTE', 60))
+AI_GLOBAL_BURST = int(os.getenv('WORKZEN_AI_GLOBAL_BURST', 10))
+AI_USER_PER_MINUTE = float(os.getenv('WORKZEN_AI_USER_PER_MINUTE', 6))
+AI_USER_BURST = int(os.getenv('WORKZEN_AI_USER_BURST', 3))
+AI_MAX_WAIT = float(os.getenv('WORKZEN_AI_MAX_WAIT', 30))
+
+class RateLimitTimeout(Exception):
+    pass
+
+
+# Token buckets for the whole process and for each user. Callers that find no
+# token wait in arrival order: the earliest waiter whose own bucket has a
+# token goes next, so one busy user cannot hold up everyone queued behind.
+class RateLimiter:
+    def __init__(self, global_per_minute: float = AI_GLOBAL_PER_MINUTE, global_burst: int = AI_GLOBAL_BURST,
+                 user_per_minute: float = AI_USER_PER_MINUTE, user_burst: int = AI_USER_BURST,
+                 max_wait: float = AI_MAX_WAIT, max_idle_buckets: int = 1024):
+        self.global_rate = global_per_minute / 60
+        self.global_burst = global_burst
+        self.user_rate = user_per_minute / 60
+        self.user_burst = user_burst
+        self.max_wait = max_wait
+        self.max_idle_buckets = max_idle_buckets
+        self._global = [float(global_burst), time.monotonic()]
+        self._users = {}
+        self._waiters = deque()
+        self._cond = threading.Condition()
+
+    @staticmethod
+    def _refill(bucket: list, rate: float, burst: int, now: float) -> float:
+        bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        return bucket[0]
+
+    def _user_bucket(self, user_id, now: float) -> list:
+        bucket = self._users.get(user_id)
+        if bucket is None:
+            if len(self._users) >= self.max_idle_buckets:
+                self._prune(now)
+            bucket = self._users[user_id] = [float(self.user_burst), now]
+        return bucket
+
+    def _prune(self, now: float):
+        # A full bucket is the same as a missing one, so idle users can go.
+        waiting = {ticket[0] for ticket in self._waiters}
+        for user_id, bucket in list(self._users.items()):
+            if user_id not in waiting and self._refill(bucket, self.user_rate, self.user_burst, now) >= self.user_burst:
+                del self._users[user_id]
+
+    def _next_ticket(self, now: float):
+        for ticket in self._waiters:
+            if self._refill(self._user_bucket(ticket[0], now), self.user_rate, self.user_burst, now) >= 1:
+                return ticket
+        return None
+
+    def acquire(self, user_id, timeout: Optional[float] = None) -> float:
+        timeout = self.max_wait if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        ticket = (user_id, object())
+        with self._cond:
+            self._waiters.append(ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    global_tokens = self._refill(self._global, self.global_rate, self.global_burst, now)
+                    bucket = self._user_bucket(user_id, now)
+                    user_tokens = self._refill(bucket, self.user_rate, self.user_burst, now)
+                    if global_tokens >= 1 and self._next_ticket(now) is ticket:
+                        self._global[0] -= 1
+                        bucket[0] -= 1
+                        return now - start
+                    
+                    if now >= deadline:
+                        raise RateLimitTimeout(user_id)
+                    # Sleep until either bucket could have refilled; any
+                    # release or departure from the queue wakes us sooner.
+                    wait = max((1 - global_tokens) / self.global_rate if global_tokens < 1 else 0,
+                               (1 - user_tokens) / self.user_rate if user_tokens < 1 else 0)
+                    self._cond.wait(min(max(wait, 0.001), deadline - now))
+            finally:
+                self._waiters.remove(ticket)
+                self._cond.notify_all()
+
+
+@st.cache_resource
+def get_rate_limiter() -> RateLimiter:
+    return RateLimiter()
+
+
+# Reply text shared by every caller that asked the same thing while it was
+# being produced. Readers start from the first chunk whenever they join.
+class SharedReply:
+    def __init__(self, on_finish=None):
+        self.chunks = []
+        self.done = False
+        self._on_finish = on_finish
+        self._cond = threading.Condition()
+
+    def append(self, chunk: str):
+        with self._cond:
+            self.chunks.append(chunk)
+            self._cond.notify_all()
+
+    def finish(self):
+        with self._cond:
+            if self.done:
+                return
+            self.done = True
+            self._cond.notify_all()
+        if self._on_finish:
+            self._on_finish()
+
+    def __iter__(self) -> Iterator[str]:
+        index = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: index < len(self.chunks) or self.done)
+                chunks = self.chunks[index:]
+                done = self.done
+            yield from chunks
+            index += len(chunks)
+            if done and not chunks:
+                return
 
-🆘 **Crisis Resources:**
-- 988 Suicide & Crisis Lifeline: Call or text 988
-- Crisis Text Line: Text HOME to 741741
-- SAMHSA Helpline: 1-800-662-4357
+    def text(self) -> str:
+        return ''.join(self)
 
-**Christian Crisis Support:**
-- Focus on the Family: 1-800-A-FAMILY
-- New Life Ministries: 1-800-NEW-LIFE
 
-**Remember God's Truth:**
-"For I know the plans I have for you," declares the Lord, "plans to prosper you and not to harm you, to give you hope and a future." - Jeremiah 29:11
+# One SharedReply per (user_id, normalized prompt) while an upstream call is
+# running, so a double submit or a rerun rides along instead of calling again.
+class InFlightReplies:
+    def __init__(self):
+        self.coalesced = 0
+        self._replies = {}
+        self._lock = threading.Lock()
 
-Please also connect with your pastor, a Christian counselor, or a trusted believer. You are not alone, and God has a purpose for your life."""
+    def join(self, user_id, user_message: str) -> tuple:
+        key = (user_id, ResponseCache.normalize(user_message))
+        with self._lock:
+            reply = self._replies.get(key)
+            if reply is not None:
+                self.coalesced += 1
+                return reply, False
+            reply = SharedReply(on_finish=lambda: self._release(key, reply))
+            self._replies[key] = reply
+            return reply, True
 
-    system_prompt = """You are WorkZen, a Christian workplace stress assistant. You provide:
+    def _release(self, key, reply: SharedReply):
+        with self._lock:
+            if self._replies.get(key) is reply:
+                del self._replies[key]
 
-1. Biblical encouragement and wisdom for workplace challenges
-2. Practical stress management techniques grounded in Christian faith
-3. Prayer support and spiritual guidance
-4. Compassionate listening and validation
+    def __len__(self):
+        with self._lock:
+            return len(self._replies)
 
-Guidelines:
-- Always integrate biblical wisdom naturally, not forced
-- Include relevant Bible verses when appropriate
-- Provide practical, actionable advice
-- Be warm, encouraging, and empathetic
-- Keep responses under 300 words
-- End with a question to continue the conversation
 
-Current context:"""
+@st.cache_resource
+def get_inflight_replies() -> InFlightReplies:
+    return InFlightReplies()
+
+def _produce_reply(reply: SharedReply, user_id, headers: Dict, payload: Dict, stream: bool,
+                   fallback: str, client: MistralClient, limiter: RateLimiter,
+                   cache: ResponseCache, cache_key: Optional[str]):
+    # Runs without Streamlit's script context when streaming, so everything
+    # behind st.cache_resource is resolved by the caller and passed in.
+    chunks = []
+    try:
+        waited = limiter.acquire(user_id)
+        observe('ai.rate_limit_wait', waited)
+        start = time.perf_counter()
+        with client.post(headers, payload, stream=stream) as response:
+            if response.status_code in MistralClient.RETRY_STATUSES:
+                # Still overloaded or failing after the client's retries.
+                reply.append(fallback)
+                return
+            if response.status_code != 200:
+                reply.append(_error_response(response.status_code))
+                return
+            
+            if stream:
+                for chunk in _iter_sse_content(response):
+                    if not chunks:
+                        observe('ai.stream_first_token', time.perf_counter() - start)
+                    chunks.append(chunk)
+                    reply.append(chunk)
+            else:
+                content = response.json()['choices'][0]['message']['content']
+                chunks.append(content)
+                reply.append(content)
     
-    if context.get('recent_stress_level'):
-        system_prompt += f"\n- User's recent stress level: {context['recent_stress_level']}/10"
+    except Exception:
+        logging.exception('WorkZen could not get a reply from Mistral')
+        # Text already delivered stays; only a reply with nothing in it
+        # falls back to the canned response.
+        if chunks:
+            reply.append("\n\n" + CONNECTION_ERROR_RESPONSE)
+        else:
+            reply.append(fallback)
+    else:
+        # Outside the handler above, so a failure here never appends to a
+        # reply that was already delivered in full.
+        if chunks and stream:
+            observe('ai.stream_total', time.perf_counter() - start)
+        if chunks and cache_key:
+            try:
+                cache.put(cache_key, ''.join(chunks))
+            except Exception:
+                logging.exception('WorkZen could not cache a reply')
+    finally:
+        reply.finish()
+
+def _start_reply(user_message: str, context: Dict, api_key: str, stream: bool):
+    cache = get_response_cache()
+    cache_key = None
+    messages = build_chat_messages(user_message, context)
+    if not _history_turns(context):
+        cache_key = cache.make_key(messages[0]['content'], user_message)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached, False
     
-    if context.get('time_of_day'):
-        hour = datetime.datetime.now().hour
-        if hour < 10:
-            system_prompt += "\n- Morning - focus on starting the day with God"
-        elif hour > 17:
-            system_prompt += "\n- Evening - focus on reflection and rest"
+    # A double submit or a rerun while the first call is still running joins
+    # that call rather than sending the same prompt upstream again.
+    reply, is_leader = get_inflight_replies().join(context.get('user_id'), user_message)
+    if not is_leader:
+        return reply, False
     
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
+    headers, payload = _build_request(api_key, messages, stream=stream)
+    args = (reply, context.get('user_id'), headers, payload, stream, local_fallback_response(user_message),
+            get_mistral_client(), get_rate_limiter(), cache, cache_key)
+    return reply, args
+
+@timed('ai.get_ai_response')
+def get_ai_response(user_message: str, context: Dict) -> str:
+    if _is_crisis_message(user_message):
+        return CRISIS_RESPONSE
     
-    payload = {
-        "model": "mistral-small-latest",
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_message}
-        ],
-        "max_tokens": 400,
-        "temperature": 0.7
-    }
+    api_key = os.getenv('MISTRAL_API_KEY')
     
-    try:
-        response = requests.post(
-            "https://api.mistral.ai/v1/chat/completions",
-            headers=headers,
-            json=payload,
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            return data['choices'][0]['message']['content']
-        elif response.status_code == 401:
-            return "I'm having authentication issues with my API. Please check that your API key is valid."
-        elif response.status_code == 429:
-            return "I'm getting too many requests right now. Please wait a moment and try again."
-        else:
-            return f"I'm experiencing some technical difficulties (Error {response.status_code}). Please try again in a moment."
-            
-    except Exception as e:
-        return "I'm having trouble connecting right now. Please try again in a moment."
+    if not api_key:
+        return local_fallback_response(user_message)
+    
+    reply, args = _start_reply(user_message, context, api_key, stream=False)
+    if args:
+        _produce_reply(*args)
+    return reply if isinstance(reply, str) else reply.text()
 
-def get_or_create_user(username: str) -> int:
-    conn = sqlite3.connect('workzen.db')
-    cursor = conn.cursor()
+def _iter_sse_content(response) -> Iterator[str]:
+    # The completions API streams "data: {json}" events and ends with "data: [DONE]".
+    response.encoding = 'utf-8'
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith('data:'):
+            continue
+        data = line[len('data:'):].strip()
+        if data == '[DONE]':
+            break
+        event = json.loads(data)
+        for choice in event.get('choices', []):
+            content = choice.get('delta', {}).get('content')
+            if content:
+                yield content
+
+def stream_ai_response(user_message: str, context: Dict) -> Iterator[str]:
+    if _is_crisis_message(user_message):
+        yield CRISIS_RESPONSE
+        return
     
-    cursor.execute('SELECT id FROM users WHERE username = ?', (username,))
-    user = cursor.fetchone()
+    api_key = os.getenv('MISTRAL_API_KEY')
     
-    if user:
-        user_id = user[0]
-    else:
-        cursor.execute('INSERT INTO users (username) VALUES (?)', (username,))
-        user_id = cursor.lastrowid
-        conn.commit()
+    if not api_key:
+        yield local_fallback_response(user_message)
+        return
+    
+    reply, args = _start_reply(user_message, context, api_key, stream=True)
+    if isinstance(reply, str):
+        yield reply
+        return
+    
+    # The upstream call runs on its own thread, so a rerun that abandons this
+    # generator does not cut off the reply other callers are reading.
+    if args:
+        threading.Thread(target=_produce_reply, args=args, name='workzen-reply', daemon=True).start()
+    yield from reply
+
+def find_user(username: str) -> Optional[int]:
+    with get_db().connection() as conn:
+        row = conn.execute('SELECT id FROM users WHERE username = ?', (username,)).fetchone()
+    return row[0] if row else None
+
+def user_exists(user_id: int) -> bool:
+    with get_db().connection() as conn:
+        return conn.execute('SELECT 1 FROM users WHERE id = ?', (user_id,)).fetchone() is not None
+
+@timed()
+def get_or_create_user(username: str) -> int:
+    with get_db().connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT id FROM users WHERE username = ?', (username,))
+        user = cursor.fetchone()
+        
+        if user:
+            user_id = user[0]
+        else:
+            cursor.execute('INSERT INTO users (username) VALUES (?)', (username,))
+            user_id = cursor.lastrowid
+            conn.commit()
     
-    conn.close()
     return user_id
 
+@timed()
 def save_conversation(user_id: int, message: str, response: str):
-    conn = sqlite3.connect('workzen.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('''
+    get_writer().submit(user_id, '''
         INSERT INTO conversations (user_id, message, response)
         VALUES (?, ?, ?)
     ''', (user_id, message, response))
+
+# The Chat tab keeps only the newest CHAT_MEMORY_MESSAGES messages in session
+# state (an even number, so whole turns fall off together) and pages anything
+# older back in from the conversations table, at most CHAT_EARLIER_MAX_PAGES
+# pages of CHAT_PAGE_SIZE turns at a time.
+CHAT_MEMORY_MESSAGES = 2 * int(os.getenv('WORKZEN_CHAT_MEMORY_TURNS', 20))
+CHAT_PAGE_SIZE = 10
+CHAT_EARLIER_MAX_PAGES = 5
+
+@timed()
+@cached_per_user
+def get_conversation_page(user_id: int, before: tuple, limit: int = CHAT_PAGE_SIZE):
+    # Keyset pagination on (timestamp, id), newest first; pass the last row's
+    # (timestamp, id) as `before` for the next page. Archived turns are merged
+    # in from the monthly chunks that can still reach this page.
+    get_writer().sync(user_id)
+    with get_db().connection() as conn:
+        rows = conn.execute('''
+            SELECT id, message, response, timestamp FROM conversations
+            WHERE user_id = ? AND (timestamp, id) < (?, ?)
+            ORDER BY timestamp DESC, id DESC
+            LIMIT ?
+        ''', (user_id, *before, limit)).fetchall()
+        oldest_month = rows[-1][3][:7] if len(rows) == limit else ''
+        months = [row[0] for row in conn.execute('''
+            SELECT month FROM conversation_archive
+            WHERE user_id = ? AND month <= ? AND month >= ?
+            ORDER BY month DESC
+        ''', (user_id, before[0][:7], oldest_month)).fetchall()]
     
-    conn.commit()
-    conn.close()
+    archived = []
+    for month in months:
+        if len(archived) >= limit:
+            break
+        archived.extend(
+            (row_id, message, response, timestamp)
+            for row_id, timestamp, message, response in reversed(get_archived_month(user_id, month))
+            if (timestamp, row_id) < tuple(before)
+        )
+    if not archived:
+        return rows
+    merged = sorted(rows + archived, key=lambda row: (row[3], row[0]), reverse=True)
+    return merged[:limit]
 
-def save_stress_checkin(user_id: int, stress_data: Dict):
-    conn = sqlite3.connect('workzen.db')
-    cursor = conn.cursor()
+# Conversations older than RETENTION_DAYS move into conversation_archive as
+# one compressed JSON chunk per user and month, [id, timestamp, message,
+# response] rows in time order. The chat history pager and exports read the
+# chunks back; full-text search only covers turns that are still live.
+RETENTION_DAYS = int(os.getenv('WORKZEN_RETENTION_DAYS', 365))
+ARCHIVE_CODEC = os.getenv('WORKZEN_ARCHIVE_CODEC', 'zlib')
+ARCHIVE_CODECS = ['zlib', 'zstd']
+VACUUM_INTERVAL = float(os.getenv('WORKZEN_VACUUM_INTERVAL', 300))
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd archives need zstandard: pip install zstandard")
+    return zstandard
+
+def _archive_compress(data: bytes, codec: str) -> bytes:
+    if codec == 'zlib':
+        return zlib.compress(data, 9)
+    if codec == 'zstd':
+        return _zstd().ZstdCompressor(level=19).compress(data)
+    raise ValueError(f"Unknown archive codec: {codec}")
+
+def _archive_decompress(payload: bytes, codec: str) -> List[tuple]:
+    if codec == 'zlib':
+        data = zlib.decompress(payload)
+    elif codec == 'zstd':
+        data = _zstd().ZstdDecompressor().decompress(payload)
+    else:
+        raise ValueError(f"Unknown archive codec: {codec}")
+    return [tuple(row) for row in json.loads(data)]
+
+@timed()
+@cached_per_user
+def get_archived_month(user_id: int, month: str) -> List[tuple]:
+    with get_db().connection() as conn:
+        row = conn.execute(
+            'SELECT payload, codec FROM conversation_archive WHERE user_id = ? AND month = ?', (user_id, month)
+        ).fetchone()
+    return _archive_decompress(*row) if row else []
+
+def iter_archived_conversations(user_id: int) -> Iterator[List[tuple]]:
+    # One month at a time, oldest first, for exports.
+    with get_db().connection() as conn:
+        months = [row[0] for row in conn.execute(
+            'SELECT month FROM conversation_archive WHERE user_id = ? ORDER BY month', (user_id,)
+        ).fetchall()]
+    for month in months:
+        with get_db().connection() as conn:
+            row = conn.execute(
+                'SELECT payload, codec FROM conversation_archive WHERE user_id = ? AND month = ?', (user_id, month)
+            ).fetchone()
+        if row:
+            yield _archive_decompress(*row)
+
+def _next_month(month: str) -> str:
+    year, number = int(month[:4]), int(month[5:7])
+    return f'{year + number // 12:04d}-{number % 12 + 1:02d}'
+
+@timed()
+def archive_conversations(older_than_days: int = RETENTION_DAYS, codec: str = ARCHIVE_CODEC,
+                          today: Optional[datetime.date] = None) -> Dict:
+    # One transaction per user: the month's live rows are merged into its
+    # chunk (a month straddling the cutoff is topped up on later runs) and
+    # deleted, so a turn is always in exactly one of the two tables.
+    if codec not in ARCHIVE_CODECS:
+        raise ValueError(f"Unknown archive codec: {codec}")
+    if codec == 'zstd':
+        _zstd()
+    cutoff = ((today or datetime.date.today()) - datetime.timedelta(days=older_than_days)).isoformat()
+    get_writer().flush()
     
-    cursor.execute('''
+    with get_db().connection() as conn:
+        groups = conn.execute('''
+            SELECT user_id, substr(timestamp, 1, 7) AS month
+            FROM conversations
+            WHERE timestamp < ?
+            GROUP BY user_id, month
+            ORDER BY user_id, month
+        ''', (cutoff,)).fetchall()
+    
+    result = {'cutoff': cutoff, 'codec': codec, 'users': 0, 'chunks': 0, 'turns': 0, 'raw_bytes': 0, 'stored_bytes': 0}
+    for user_id, user_groups in itertools.groupby(groups, key=lambda group: group[0]):
+        with get_db().connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for _, month in user_groups:
+                    bounds = (user_id, month, _next_month(month), cutoff)
+                    rows = conn.execute('''
+                        SELECT id, timestamp, message, response FROM conversations
+                        WHERE user_id = ? AND timestamp >= ? AND timestamp < ? AND timestamp < ?
+                    ''', bounds).fetchall()
+                    existing = conn.execute(
+                        'SELECT payload, codec FROM conversation_archive WHERE user_id = ? AND month = ?',
+                        (user_id, month)
+                    ).fetchone()
+                    turns = (_archive_decompress(*existing) if existing else []) + rows
+                    turns.sort(key=lambda turn: (turn[1], turn[0]))
+                    data = json.dumps(turns, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+                    payload = _archive_compress(data, codec)
+                    conn.execute('''
+                        INSERT INTO conversation_archive (user_id, month, turns, codec, raw_bytes, payload, archived_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT (user_id, month) DO UPDATE SET
+                            turns = excluded.turns, codec = excluded.codec, raw_bytes = excluded.raw_bytes,
+                            payload = excluded.payload, archived_at = excluded.archived_at
+                    ''', (user_id, month, len(turns), codec, len(data), payload, _utc_timestamp()))
+                    conn.execute('''
+                        DELETE FROM conversations
+                        WHERE user_id = ? AND timestamp >= ? AND timestamp < ? AND timestamp < ?
+                    ''', bounds)
+                    result['chunks'] += 1
+                    result['turns'] += len(rows)
+                    result['raw_bytes'] += len(data)
+                    result['stored_bytes'] += len(payload)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        result['users'] += 1
+        get_read_cache().bump(user_id)
+    return result
+
+def database_size(db: Optional[Database] = None) -> Dict:
+    db = db or get_db()
+    with db.connection() as conn:
+        page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+        freelist = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        auto_vacuum = conn.execute('PRAGMA auto_vacuum').fetchone()[0]
+    return {
+        'bytes': page_size * page_count,
+        'free_bytes': page_size * freelist,
+        'incremental_vacuum': auto_vacuum == 2,
+    }
+
+def incremental_vacuum(db: Optional[Database] = None, max_pages: Optional[int] = None, step_pages: int = 256,
+                       pause: float = 0.05) -> int:
+    # Returns free pages to the filesystem a few hundred at a time, each step
+    # its own short write, so the write-behind queue is never held up for long.
+    db = db or get_db()
+    freed = 0
+    while max_pages is None or freed < max_pages:
+        with db.connection() as conn:
+            if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+                break
+            free = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            step = min(step_pages, free, max_pages - freed if max_pages is not None else free)
+            if step <= 0:
+                break
+            conn.execute(f'PRAGMA incremental_vacuum({step})').fetchall()
+            conn.commit()
+            if conn.execute('PRAGMA freelist_count').fetchone()[0] >= free:
+                break
+        freed += step
+        time.sleep(pause)
+    return freed
+
+def compact_database(full: bool = False) -> Dict:
+    # Deleting archived rows leaves delete markers in the search index until
+    # it is merged, and only frees pages the deleted rows filled completely.
+    # A full VACUUM also repacks half-empty pages; databases created before
+    # incremental auto-vacuum need one to switch over.
+    get_writer().flush()
+    before = database_size()
+    with get_db().connection() as conn:
+        if _search_index_exists(conn.cursor()):
+            conn.execute("INSERT INTO conversations_fts (conversations_fts) VALUES ('optimize')")
+            conn.commit()
+    full = full or not before['incremental_vacuum']
+    if full:
+        with get_db().connection() as conn:
+            conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+            conn.execute('VACUUM')
+    else:
+        incremental_vacuum(pause=0)
+    with get_db().connection() as conn:
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    return {'before': before, 'after': database_size(), 'full_vacuum': full}
+
+@st.cache_resource
+def get_vacuum_worker() -> Optional[threading.Thread]:
+    if VACUUM_INTERVAL <= 0:
+        return None
+    db = get_db()
+    
+    def run():
+        while True:
+            time.sleep(VACUUM_INTERVAL)
+            try:
+                incremental_vacuum(db)
+            except sqlite3.Error:
+                logging.exception('WorkZen incremental vacuum failed')
+    
+    worker = threading.Thread(target=run, name='workzen-vacuum', daemon=True)
+    worker.start()
+    return worker
+
+@timed()
+def save_stress_checkin(user_id: int, stress_data: Dict):
+    insert = ('''
         INSERT INTO stress_checkins 
         (user_id, date, morning_stress, evening_stress, workload_rating, energy_level, notes)
         VALUES (?, ?, ?, ?, ?, ?, ?)
     ''', (
         user_id,
-        stress_data['date'],
+        _iso_date(stress_data['date']),
         stress_data.get('morning_stress'),
         stress_data.get('evening_stress'),
         stress_data.get('workload_rating'),
         stress_data.get('energy_level'),
         stress_data.get('notes', '')
     ))
-    
-    conn.commit()
-    conn.close()
+    get_writer().submit_many(user_id, [insert] + _rollup_statements(user_id, stress_data))
+    get_read_cache().bump(user_id)
 
+@timed()
+@cached_per_user
 def get_user_stress_history(user_id: int) -> pd.DataFrame:
-    conn = sqlite3.connect('workzen.db')
-    df = pd.read_sql_query('''
-        SELECT date, morning_stress, evening_stress, workload_rating, energy_level
-        FROM stress_checkins
-        WHERE user_id = ?
-        ORDER BY date DESC
-        LIMIT 30
-    ''', conn, params=(user_id,))
-    conn.close()
+    get_writer().sync(user_id)
+    with get_db().connection() as conn:
+        df = pd.read_sql_query('''
+            SELECT date, morning_stress, evening_stress, workload_rating, energy_level
+            FROM stress_checkins
+            WHERE user_id = ?
+            ORDER BY date DESC
+        ''', conn, params=(user_id,))
     return df
 
+@timed()
 def save_prayer_request(user_id: int, request_text: str, category: str = "work"):
-    conn = sqlite3.connect('workzen.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('''
+    get_writer().submit(user_id, '''
         INSERT INTO prayer_requests (user_id, request_text, category)
         VALUES (?, ?, ?)
     ''', (user_id, request_text, category))
-    
-    conn.commit()
-    conn.close()
+    get_read_cache().bump(user_id)
 
-def get_user_prayer_requests(user_id: int):
-    conn = sqlite3.connect('workzen.db')
-    cursor = conn.cursor()
+PRAYER_CATEGORIES = ["work", "relationships", "health", "finances", "family", "other"]
+
+PRAYER_STATUS_FILTERS = {"All": None, "Still praying": False, "Answered": True}
+
+PRAYER_PAGE_SIZE = 20
+
+@timed()
+@cached_per_user
+def get_user_prayer_requests(user_id: int, limit: Optional[int] = None, before: Optional[tuple] = None,
+                             category: Optional[str] = None, answered: Optional[bool] = None):
+    # Keyset pagination: pass the (created_at, id) of the last row seen as
+    # `before` to get the next page without OFFSET scans.
+    conditions = ['user_id = ?']
+    params = [user_id]
+    if category:
+        conditions.append('category = ?')
+        params.append(category)
+    if answered is not None:
+        conditions.append('is_answered = ?')
+        params.append(1 if answered else 0)
+    if before:
+        conditions.append('(created_at, id) < (?, ?)')
+        params.extend(before)
     
-    cursor.execute('''
+    sql = f'''
         SELECT id, request_text, category, is_answered, answered_text, created_at, answered_at
         FROM prayer_requests
-        WHERE user_id = ?
-        ORDER BY created_at DESC
-    ''', (user_id,))
+        WHERE {' AND '.join(conditions)}
+        ORDER BY created_at DESC, id DESC
+    '''
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params.append(limit)
     
-    requests = cursor.fetchall()
-    conn.close()
+    get_writer().sync(user_id)
+    with get_db().connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        requests = cursor.fetchall()
     return requests
 
+@timed()
+@cached_per_user
+def get_prayer_request_counts(user_id: int) -> Dict:
+    get_writer().sync(user_id)
+    with get_db().connection() as conn:
+        rows = conn.execute('''
+            SELECT category, is_answered, COUNT(*)
+            FROM prayer_requests
+            WHERE user_id = ?
+            GROUP BY category, is_answered
+        ''', (user_id,)).fetchall()
+    
+    counts = {'total': 0, 'answered': 0, 'by_category': {}}
+    for category, is_answered, count in rows:
+        counts['total'] += count
+        if is_answered:
+            counts['answered'] += count
+        counts['by_category'][category] = counts['by_category'].get(category, 0) + count
+    return counts
+
+@timed()
 def mark_prayer_answered(prayer_id: int, answered_text: str):
-    conn = sqlite3.connect('workzen.db')
-    cursor = conn.cursor()
+    with get_db().connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            UPDATE prayer_requests
+            SET is_answered = TRUE, answered_text = ?, answered_at = ?
+            WHERE id = ?
+        ''', (answered_text, _utc_timestamp(), prayer_id))
+        
+        conn.commit()
+        
+        row = cursor.execute('SELECT user_id FROM prayer_requests WHERE id = ?', (prayer_id,)).fetchone()
     
-    cursor.execute('''
-        UPDATE prayer_requests
-        SET is_answered = TRUE, answered_text = ?, answered_at = ?
-        WHERE id = ?
-    ''', (answered_text, datetime.datetime.now(), prayer_id))
+    if row:
+        get_read_cache().bump(row[0])
+
+@timed()
+@cached_per_user
+def get_latest_stress_level(user_id: int) -> Optional[int]:
+    get_writer().sync(user_id)
+    with get_db().connection() as conn:
+        row = conn.execute('''
+            SELECT evening_stress, morning_stress
+            FROM stress_checkins
+            WHERE user_id = ?
+            ORDER BY date DESC, id DESC
+            LIMIT 1
+        ''', (user_id,)).fetchone()
+    
+    if not row:
+        return None
+    return row[0] if row[0] is not None else row[1]
+
+def _summary_line(message: str) -> str:
+    first_sentence = re.split(r'(?<=[.!?])\s', message.strip(), maxsplit=1)[0]
+    if len(first_sentence) > 140:
+        first_sentence = first_sentence[:137].rstrip() + '...'
+    return f"- Shared: {first_sentence}"
+
+@timed()
+def get_conversation_summary(user_id: int) -> str:
+    # The summary covers everything except the newest SUMMARY_RECENT_TURNS
+    # turns, which usually still reach the model verbatim. Each call folds in
+    # only the turns stored since the last update and drops the oldest lines
+    # once the summary exceeds SUMMARY_TOKEN_BUDGET.
+    get_writer().sync(user_id)
+    with get_db().connection() as conn:
+        row = conn.execute(
+            'SELECT summary, last_conversation_id FROM conversation_summaries WHERE user_id = ?',
+            (user_id,)
+        ).fetchone()
+        summary, last_id = row if row else ('', 0)
+        
+        new_turns = conn.execute('''
+            SELECT id, message FROM conversations
+            WHERE user_id = ? AND id > ? AND id <= COALESCE((
+                SELECT id FROM conversations WHERE user_id = ?
+                ORDER BY id DESC LIMIT 1 OFFSET ?
+            ), 0)
+            ORDER BY id
+        ''', (user_id, last_id, user_id, SUMMARY_RECENT_TURNS)).fetchall()
+        
+        if not new_turns:
+            return summary
+        
+        lines = summary.splitlines() + [_summary_line(message) for _, message in new_turns if message]
+        while len(lines) > 1 and estimate_tokens('\n'.join(lines)) > SUMMARY_TOKEN_BUDGET:
+            lines.pop(0)
+        summary = '\n'.join(lines)
+        
+        conn.execute('''
+            INSERT INTO conversation_summaries (user_id, summary, last_conversation_id, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (user_id) DO UPDATE SET
+                summary = excluded.summary,
+                last_conversation_id = excluded.last_conversation_id,
+                updated_at = excluded.updated_at
+        ''', (user_id, summary, new_turns[-1][0], _utc_timestamp()))
+        conn.commit()
+    
+    return summary
+
+def rebuild_stress_rollups(user_id: Optional[int] = None):
+    get_writer().sync(user_id)
+    with get_db().connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            _rebuild_rollups(conn.cursor(), user_id)
+            _bump_data_version(conn, user_id)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    
+    if user_id is None:
+        get_read_cache().clear()
+    else:
+        get_read_cache().bump(user_id)
+
+@timed()
+@cached_per_user
+def get_stress_rollups(user_id: int, grain: str, start: datetime.date, end: datetime.date) -> pd.DataFrame:
+    get_writer().sync(user_id)
+    averages = ', '.join(
+        f'CAST({metric}_sum AS REAL) / NULLIF({metric}_count, 0) AS {metric}'
+        for metric in ROLLUP_METRICS
+    )
+    with get_db().connection() as conn:
+        df = pd.read_sql_query(f'''
+            SELECT period_start, checkins, {averages}
+            FROM {ROLLUP_TABLES[grain]}
+            WHERE user_id = ? AND period_start BETWEEN ? AND ?
+            ORDER BY period_start
+        ''', conn, params=(user_id, _rollup_period_start(start, grain), end.isoformat()))
+    # Periods without a value for a metric come back as NULL; keep the
+    # columns numeric so plotly can draw them side by side.
+    df[ROLLUP_METRICS] = df[ROLLUP_METRICS].astype(float)
+    return df
+
+ROLLUP_GRAIN_LABELS = {'day': 'Daily', 'week': 'Weekly', 'month': 'Monthly'}
+
+PROGRESS_RANGES = {
+    "Last 30 days": (30, 'day'),
+    "Last 12 weeks": (84, 'week'),
+    "Last 12 months": (365, 'month'),
+    "All time": (None, 'month'),
+    "All time (daily)": (None, 'day'),
+}
+
+# Trend lines longer than this are downsampled with LTTB before plotting.
+PROGRESS_MAX_POINTS = int(os.getenv('WORKZEN_CHART_POINTS', 400))
+
+def progress_window(range_label: str, today: Optional[datetime.date] = None) -> tuple:
+    days, grain = PROGRESS_RANGES[range_label]
+    end = today or datetime.date.today()
+    start = end - datetime.timedelta(days=days - 1) if days else datetime.date(1900, 1, 1)
+    return start, end, grain
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    # Largest-Triangle-Three-Buckets: keep the first and last points and, from
+    # each bucket in between, the point forming the largest triangle with the
+    # previously kept point and the mean of the next bucket.
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    kept = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+        areas = np.abs((x[kept] - next_x) * (y[start:end] - y[kept])
+                       - (x[kept] - x[start:end]) * (next_y - y[kept]))
+        kept = start + int(areas.argmax())
+        selected[bucket + 1] = kept
+    return selected
+
+def _downsample_trend(trend: pd.DataFrame, metrics: List[str], max_points: int) -> pd.DataFrame:
+    # Long format, one frame per metric, so each line keeps its own peaks.
+    frames = []
+    for metric in metrics:
+        series = trend[['period_start', metric]].dropna()
+        if len(series) > max_points:
+            x = series['period_start'].to_numpy().astype('datetime64[D]').astype(np.float64)
+            series = series.iloc[lttb_indices(x, series[metric].to_numpy(), max_points)]
+        frames.append(pd.DataFrame({'period_start': series['period_start'], 'variable': metric,
+                                    'value': series[metric]}))
+    return pd.concat(frames, ignore_index=True)
+
+@timed()
+@cached_per_user
+def get_workload_energy_density(user_id: int, start: datetime.date, end: datetime.date) -> pd.DataFrame:
+    # Ratings are whole numbers from 1 to 10, so each (workload, energy) pair
+    # is a bin and the scatter never has more than 100 points.
+    get_writer().sync(user_id)
+    with get_db().connection() as conn:
+        df = pd.read_sql_query('''
+            SELECT workload_rating, energy_level, COUNT(*) AS checkins, AVG(morning_stress) AS morning_stress
+            FROM stress_checkins
+            WHERE user_id = ? AND date BETWEEN ? AND ?
+              AND workload_rating IS NOT NULL AND energy_level IS NOT NULL
+            GROUP BY workload_rating, energy_level
+        ''', conn, params=(user_id, start.isoformat(), end.isoformat()))
+    df['morning_stress'] = df['morning_stress'].astype(float)
+    return df
+
+# Built figures are cached with the user's other reads, so reruns that do not
+# follow a write reuse them as they are.
+# Either figure is None when the range has nothing to plot for it.
+@timed('chart.build_progress_figures')
+@cached_per_user
+def build_progress_figures(user_id: int, start: datetime.date, end: datetime.date, grain: str) -> tuple:
+    trend = get_stress_rollups(user_id, grain, start, end)
+    trend = trend.assign(period_start=pd.to_datetime(trend['period_start']))
+    lines = _downsample_trend(trend, ['morning_stress', 'evening_stress'], PROGRESS_MAX_POINTS)
+    
+    fig = None if lines.empty else px.line(lines, x='period_start', y='value', color='variable',
+                 title=f'Stress Levels Over Time ({ROLLUP_GRAIN_LABELS[grain]} Averages)',
+                 labels={'value': 'Stress Level', 'period_start': 'Date'},
+                 color_discrete_map={
+                     'morning_stress': '#ff6b6b',
+                     'evening_stress': '#4ecdc4'
+                 })
+    
+    density = get_workload_energy_density(user_id, start, end)
+    fig2 = None if density.empty else px.scatter(density, x='workload_rating', y='energy_level',
+                     title='Workload vs Energy Level',
+                     labels={'workload_rating': 'Workload', 'energy_level': 'Energy', 'checkins': 'Check-ins'},
+                     size='checkins',
+                     color='morning_stress',
+                     color_continuous_scale='RdYlGn_r')
+    return fig, fig2
+
+@timed()
+@cached_per_user
+def get_stress_totals(user_id: int, start: datetime.date, end: datetime.date) -> Dict:
+    # Whole months inside the range come from stress_monthly and only the
+    # ragged edges from stress_daily, so a multi-year range reads a few dozen
+    # rows rather than every check-in.
+    get_writer().sync(user_id)
+    first_full_month = start if start.day == 1 else (start.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+    after_last_full_month = (end + datetime.timedelta(days=1)).replace(day=1)
+    
+    sums = ', '.join(
+        f'SUM({metric}_count), SUM({metric}_sum), MIN({metric}_min), MAX({metric}_max)'
+        for metric in ROLLUP_METRICS
+    )
+    if first_full_month < after_last_full_month:
+        ranges = [
+            ('stress_monthly', first_full_month, after_last_full_month - datetime.timedelta(days=1)),
+            ('stress_daily', start, first_full_month - datetime.timedelta(days=1)),
+            ('stress_daily', after_last_full_month, end),
+        ]
+    else:
+        ranges = [('stress_daily', start, end)]
+    
+    rows = []
+    with get_db().connection() as conn:
+        for table, range_start, range_end in ranges:
+            if range_start > range_end:
+                continue
+            rows.append(conn.execute(f'''
+                SELECT SUM(checkins), {sums}
+                FROM {table}
+                WHERE user_id = ? AND period_start BETWEEN ? AND ?
+            ''', (user_id, range_start.isoformat(), range_end.isoformat())).fetchone())
+    
+    totals = {'checkins': sum(row[0] or 0 for row in rows)}
+    for i, metric in enumerate(ROLLUP_METRICS):
+        offset = 1 + i * 4
+        count = sum(row[offset] or 0 for row in rows)
+        total = sum(row[offset + 1] or 0 for row in rows)
+        minimums = [row[offset + 2] for row in rows if row[offset + 2] is not None]
+        maximums = [row[offset + 3] for row in rows if row[offset + 3] is not None]
+        totals[metric] = {
+            'count': count,
+            'mean': total / count if count else None,
+            'min': min(minimums) if minimums else None,
+            'max': max(maximums) if maximums else None,
+        }
+    return totals
+
+SEARCH_SOURCES = {
+    'conversations_fts': ('conversation', 'conversations', 'timestamp', 'message'),
+    'stress_notes_fts': ('check-in note', 'stress_checkins', 'date', 'notes'),
+    'prayer_requests_fts': ('prayer request', 'prayer_requests', 'created_at', 'request_text'),
+}
+
+def _fts_query(query: str) -> Optional[str]:
+    # Quote every term so user input cannot inject FTS5 syntax; the last term
+    # is a prefix match so partial words still find something.
+    terms = re.findall(r'\w+', query.lower())
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+@timed()
+def search_user_history(user_id: int, query: str, limit: int = 20) -> List[Dict]:
+    match = _fts_query(query)
+    if not match:
+        return []
+    
+    get_writer().sync(user_id)
+    with get_db().connection() as conn:
+        if not _search_index_exists(conn.cursor()):
+            return _search_user_history_like(conn, user_id, query, limit)
+        
+        selects = []
+        params = []
+        for fts_table, (source, table, date_column, _) in SEARCH_SOURCES.items():
+            text_columns = FTS_TABLES[fts_table][1]
+            # user_id gets zero weight so it filters without affecting rank,
+            # and snippets come from the first text column with a hit.
+            weights = ', '.join(['0.0'] + ['1.0'] * len(text_columns))
+            snippets = [f"snippet({fts_table}, {i}, '**', '**', '…', 12)" for i in range(1, len(text_columns) + 1)]
+            snippet = snippets[-1]
+            for candidate in reversed(snippets[:-1]):
+                snippet = f"CASE WHEN instr({candidate}, '**') THEN {candidate} ELSE {snippet} END"
+            selects.append(f'''
+                SELECT '{source}', t.id, t.{date_column},
+                       {snippet},
+                       bm25({fts_table}, {weights}) AS rank
+                FROM {fts_table}
+                JOIN {table} t ON t.id = {fts_table}.rowid
+                WHERE {fts_table} MATCH ?
+            ''')
+            # Terms are restricted to the text columns, otherwise a numeric
+            # query matches the user_id token and returns every row.
+            columns = ' '.join(text_columns)
+            params.append(f'user_id : "{int(user_id)}" AND {{{columns}}} : ({match})')
+        
+        rows = conn.execute(
+            ' UNION ALL '.join(selects) + ' ORDER BY rank LIMIT ?',
+            params + [limit]
+        ).fetchall()
+    
+    return [
+        {'source': source, 'id': row_id, 'date': date, 'snippet': snippet, 'rank': rank}
+        for source, row_id, date, snippet, rank in rows
+    ]
+
+def _search_user_history_like(conn: sqlite3.Connection, user_id: int, query: str, limit: int) -> List[Dict]:
+    pattern = f"%{query.strip()}%"
+    results = []
+    for source, table, date_column, text_column in SEARCH_SOURCES.values():
+        rows = conn.execute(f'''
+            SELECT id, {date_column}, {text_column}
+            FROM {table}
+            WHERE user_id = ? AND {text_column} LIKE ?
+            ORDER BY {date_column} DESC
+            LIMIT ?
+        ''', (user_id, pattern, limit)).fetchall()
+        results += [
+            {'source': source, 'id': row_id, 'date': date, 'snippet': text[:200], 'rank': 0.0}
+            for row_id, date, text in rows
+        ]
+    return results[:limit]
+
+def rebuild_search_index():
+    get_writer().flush()
+    with get_db().connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            _rebuild_search_index(conn.cursor())
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+CRISIS_SCAN_SOURCES = {
+    'conversations': 'message',
+    'stress_checkins': 'notes',
+    'prayer_requests': 'request_text',
+}
+
+def iter_crisis_chunks(source: str, after_id: int = 0, chunk_size: int = 5000) -> Iterator[tuple]:
+    # Yields (last_id, matches) per chunk. Each chunk is read in its own short
+    # transaction (keyset on id), so a long scan never pins a read snapshot
+    # or holds the whole table in memory.
+    detector = get_crisis_detector()
+    column = CRISIS_SCAN_SOURCES[source]
+    while True:
+        with get_db().connection() as conn:
+            rows = conn.execute(f'''
+                SELECT id, user_id, {column} FROM {source}
+                WHERE id > ?
+                ORDER BY id
+                LIMIT ?
+            ''', (after_id, chunk_size)).fetchall()
+        if not rows:
+            return
+        
+        matches = []
+        for row_id, user_id, text in rows:
+            found = detector.matches(text)
+            if found:
+                matches.append((row_id, user_id, found[0]))
+        after_id = rows[-1][0]
+        yield after_id, matches
+
+def scan_crisis_history(chunk_size: int = 5000, full: bool = False) -> Dict[str, int]:
+    # Flags past entries into crisis_flags, resuming each source from the last
+    # id scanned unless full is set.
+    get_writer().flush()
+    flagged = {}
+    for source in CRISIS_SCAN_SOURCES:
+        with get_db().connection() as conn:
+            row = conn.execute('SELECT last_id FROM crisis_scan_state WHERE source = ?', (source,)).fetchone()
+        after_id = 0 if full or not row else row[0]
+        
+        flagged[source] = 0
+        for last_id, matches in iter_crisis_chunks(source, after_id, chunk_size):
+            flagged_at = _utc_timestamp()
+            with get_db().connection() as conn:
+                conn.executemany('''
+                    INSERT OR IGNORE INTO crisis_flags (source, row_id, user_id, phrase, flagged_at)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', [(source, row_id, user_id, phrase, flagged_at) for row_id, user_id, phrase in matches])
+                conn.execute('''
+                    INSERT INTO crisis_scan_state (source, last_id) VALUES (?, ?)
+                    ON CONFLICT (source) DO UPDATE SET last_id = excluded.last_id
+                ''', (source, last_id))
+                conn.commit()
+            flagged[source] += len(matches)
+    return flagged
+
+EXPORT_TABLES = {
+    'stress_checkins': [
+        ('id', 'int'), ('date', 'str'), ('morning_stress', 'int'), ('evening_stress', 'int'),
+        ('workload_rating', 'int'), ('energy_level', 'int'), ('notes', 'str'),
+    ],
+    'conversations': [
+        ('id', 'int'), ('timestamp', 'str'), ('message', 'str'), ('response', 'str'),
+    ],
+    'prayer_requests': [
+        ('id', 'int'), ('request_text', 'str'), ('category', 'str'), ('is_answered', 'bool'),
+        ('answered_text', 'str'), ('created_at', 'str'), ('answered_at', 'str'),
+    ],
+}
+
+EXPORT_FORMATS = ['jsonl', 'csv', 'parquet']
+
+def iter_user_rows(user_id: int, table: str, chunk_size: int = 1000) -> Iterator[List[tuple]]:
+    # Chunks by id with fetchmany-sized keyset queries, so exporting years of
+    # history holds one chunk in memory at a time. Archived conversations come
+    # first, a month per chunk.
+    columns = ', '.join(name for name, _ in EXPORT_TABLES[table])
+    get_writer().sync(user_id)
+    if table == 'conversations':
+        # Same column order as EXPORT_TABLES['conversations'].
+        yield from iter_archived_conversations(user_id)
+    after_id = 0
+    while True:
+        with get_db().connection() as conn:
+            cursor = conn.execute(f'''
+                SELECT {columns} FROM {table}
+                WHERE user_id = ? AND id > ?
+                ORDER BY id
+            ''', (user_id, after_id))
+            rows = cursor.fetchmany(chunk_size)
+            cursor.close()
+        if not rows:
+            return
+        yield rows
+        after_id = rows[-1][0]
+
+def export_user_jsonl(user_id: int, tables: Optional[List[str]] = None) -> Iterator[str]:
+    for table in tables or list(EXPORT_TABLES):
+        names = [name for name, _ in EXPORT_TABLES[table]]
+        for rows in iter_user_rows(user_id, table):
+            yield ''.join(
+                json.dumps({'table': table, **dict(zip(names, row))}, ensure_ascii=False) + '\n'
+                for row in rows
+            )
+
+def export_user_csv(user_id: int, table: str) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in EXPORT_TABLES[table]])
+    for rows in iter_user_rows(user_id, table):
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def export_user_parquet(user_id: int, table: str, sink):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+    
+    types = {'int': pa.int64(), 'str': pa.string(), 'bool': pa.bool_()}
+    schema = pa.schema([(name, types[kind]) for name, kind in EXPORT_TABLES[table]])
+    with pq.ParquetWriter(sink, schema) as writer:
+        for rows in iter_user_rows(user_id, table):
+            columns = list(zip(*rows))
+            writer.write_table(pa.table(
+                [
+                    [None if value is None else bool(value) for value in column] if kind == 'bool' else list(column)
+                    for column, (_, kind) in zip(columns, EXPORT_TABLES[table])
+                ],
+                schema=schema
+            ))
+
+EXPORT_MIME_TYPES = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+def export_user_data(user_id: int, fmt: str, table: Optional[str], out):
+    # Writes an export to a binary file object. JSONL covers every table in
+    # one file; CSV and Parquet hold a single table.
+    if fmt == 'jsonl':
+        for text in export_user_jsonl(user_id, [table] if table else None):
+            out.write(text.encode('utf-8'))
+    elif fmt == 'csv':
+        for text in export_user_csv(user_id, table or 'stress_checkins'):
+            out.write(text.encode('utf-8'))
+    elif fmt == 'parquet':
+        export_user_parquet(user_id, table or 'stress_checkins', out)
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+def _export_to_tempfile(user_id: int, fmt: str, table: Optional[str]):
+    # Spooled to disk so a large export never has to be assembled in memory
+    # by the page script.
+    out = tempfile.TemporaryFile()
+    export_user_data(user_id, fmt, table, out)
+    out.seek(0)
+    return out
+
+def _validate_checkin(record: Dict) -> Dict:
+    try:
+        day = datetime.date.fromisoformat(str(record.get('date', '')).strip()[:10])
+    except ValueError:
+        raise ValueError(f"invalid date {record.get('date')!r}")
+    
+    checkin = {'date': day.isoformat(), 'notes': record.get('notes') or ''}
+    for metric in ROLLUP_METRICS:
+        value = record.get(metric)
+        if value in (None, ''):
+            checkin[metric] = None
+            continue
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{metric} must be a number, got {value!r}")
+        if not number.is_integer():
+            raise ValueError(f"{metric} must be a whole number, got {value!r}")
+        number = int(number)
+        if not 1 <= number <= 10:
+            raise ValueError(f"{metric} must be between 1 and 10, got {number}")
+        checkin[metric] = number
+    
+    if all(checkin[metric] is None for metric in ROLLUP_METRICS):
+        raise ValueError("check-in has no stress, workload or energy values")
+    return checkin
+
+def read_checkin_records(text_stream, fmt: str) -> Iterator[Dict]:
+    if fmt == 'csv':
+        yield from csv.DictReader(text_stream)
+    elif fmt == 'jsonl':
+        for line in text_stream:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get('table', 'stress_checkins') == 'stress_checkins':
+                yield record
+    else:
+        raise ValueError(f"Unknown import format: {fmt}")
+
+@timed()
+def import_stress_checkins(user_id: int, records: Iterable[Dict], chunk_size: int = 1000,
+                           max_errors: int = 100) -> Dict:
+    # Validated rows are loaded in chunked transactions together with their
+    # rollup updates; invalid rows are reported and skipped.
+    get_writer().sync(user_id)
+    imported = 0
+    errors = []
+    
+    def load(chunk):
+        with get_db().connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.executemany('''
+                    INSERT INTO stress_checkins
+                    (user_id, date, morning_stress, evening_stress, workload_rating, energy_level, notes)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', [
+                    (user_id, c['date'], c['morning_stress'], c['evening_stress'],
+                     c['workload_rating'], c['energy_level'], c['notes'])
+                    for c in chunk
+                ])
+                statements = [statement for c in chunk for statement in _rollup_statements(user_id, c)]
+                for sql, group in itertools.groupby(sorted(statements, key=lambda s: s[0]), key=lambda s: s[0]):
+                    conn.executemany(sql, [params for _, params in group])
+                _bump_data_version(conn, user_id)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+    
+    chunk = []
+    for line_number, record in enumerate(records, start=1):
+        try:
+            chunk.append(_validate_checkin(record))
+        except ValueError as e:
+            if len(errors) < max_errors:
+                errors.append((line_number, str(e)))
+            continue
+        if len(chunk) >= chunk_size:
+            load(chunk)
+            imported += len(chunk)
+            chunk = []
+    if chunk:
+        load(chunk)
+        imported += len(chunk)
+    
+    if imported:
+        get_read_cache().bump(user_id)
+    return {'imported': imported, 'errors': errors}
+
+# Weekly reflection digests are built by a headless job (python cli.py
+# weekly-digest) for the last full Monday-to-Sunday week. Users are read in
+# id order a chunk at a time; each chunk's digests and the checkpoint move
+# forward in one transaction, so an interrupted run resumes where it stopped.
+DIGEST_CHUNK_SIZE = 200
+DIGEST_CONCURRENCY = int(os.getenv('WORKZEN_DIGEST_CONCURRENCY', 4))
+
+DIGEST_METRIC_LABELS = {
+    'morning_stress': 'morning stress',
+    'evening_stress': 'evening stress',
+    'workload_rating': 'workload',
+    'energy_level': 'energy',
+}
+
+DIGEST_SYSTEM_PROMPT = """You are WorkZen, a Christian workplace wellness assistant, writing a short weekly reflection for one user.
+- Read the numbers as a trend, gently, without diagnosing
+- Acknowledge answered prayers and the requests still open
+- Include one Bible verse that fits the week
+- Suggest one small practice for the week ahead
+- Keep it under 150 words and do not ask questions"""
+
+def digest_week_start(today: Optional[datetime.date] = None) -> datetime.date:
+    today = today or datetime.date.today()
+    return today - datetime.timedelta(days=today.weekday() + 7)
+
+def iter_digest_inputs(week_start: datetime.date, after_user_id: int = 0,
+                       chunk_size: int = DIGEST_CHUNK_SIZE) -> Iterator[tuple]:
+    # Yields (last user id in the chunk, inputs for its users who checked in
+    # or prayed that week). Every figure comes from aggregate queries over the
+    # chunk's id range: stress_weekly for this week and the one before, and
+    # prayer_requests grouped by user.
+    week = week_start.isoformat()
+    previous = (week_start - datetime.timedelta(days=7)).isoformat()
+    week_end = (week_start + datetime.timedelta(days=7)).isoformat()
+    averages = ', '.join(
+        f'CAST({metric}_sum AS REAL) / NULLIF({metric}_count, 0)'
+        for metric in ROLLUP_METRICS
+    )
+    while True:
+        with get_db().connection() as conn:
+            ids = [row[0] for row in conn.execute(
+                'SELECT id FROM users WHERE id > ? ORDER BY id LIMIT ?', (after_user_id, chunk_size)
+            ).fetchall()]
+            if not ids:
+                return
+            user_range = (ids[0], ids[-1])
+            
+            weeks = conn.execute(f'''
+                SELECT user_id, period_start, checkins, {averages}
+                FROM stress_weekly
+                WHERE user_id BETWEEN ? AND ? AND period_start IN (?, ?)
+            ''', (*user_range, week, previous)).fetchall()
+            prayers = conn.execute('''
+                SELECT user_id,
+                       SUM(created_at >= ? AND created_at < ?),
+                       SUM(answered_at >= ? AND answered_at < ?),
+                       SUM(NOT is_answered)
+                FROM prayer_requests
+                WHERE user_id BETWEEN ? AND ?
+                GROUP BY user_id
+            ''', (week, week_end, week, week_end, *user_range)).fetchall()
+            categories = conn.execute('''
+                SELECT user_id, category, COUNT(*) AS requests
+                FROM prayer_requests
+                WHERE user_id BETWEEN ? AND ? AND created_at >= ? AND created_at < ?
+                GROUP BY user_id, category
+                ORDER BY user_id, requests DESC
+            ''', (*user_range, week, week_end)).fetchall()
+        
+        inputs = {}
+        
+        def entry(user_id):
+            if user_id not in inputs:
+                inputs[user_id] = {
+                    'user_id': user_id, 'week_start': week, 'checkins': 0, 'averages': {}, 'previous': {},
+                    'prayers_new': 0, 'prayers_answered': 0, 'prayers_open': 0, 'categories': [],
+                }
+            return inputs[user_id]
+        
+        for user_id, period_start, checkins, *values in weeks:
+            digest = entry(user_id)
+            if period_start == week:
+                digest['checkins'] = checkins
+            digest['averages' if period_start == week else 'previous'] = {
+                metric: value for metric, value in zip(ROLLUP_METRICS, values) if value is not None
+            }
+        for user_id, new, answered, still_open in prayers:
+            digest = entry(user_id)
+            digest['prayers_new'], digest['prayers_answered'], digest['prayers_open'] = new or 0, answered or 0, still_open or 0
+        for user_id, category, _ in categories:
+            entry(user_id)['categories'].append(category)
+        
+        yield ids[-1], [
+            digest for _, digest in sorted(inputs.items())
+            if digest['checkins'] or digest['prayers_new'] or digest['prayers_answered']
+        ]
+        after_user_id = ids[-1]
+
+def digest_summary(digest: Dict) -> str:
+    lines = []
+    if digest['checkins']:
+        parts = []
+        for metric, label in DIGEST_METRIC_LABELS.items():
+            value = digest['averages'].get(metric)
+            if value is None:
+                continue
+            part = f"{label} {value:.1f}/10"
+            before = digest['previous'].get(metric)
+            if before is not None:
+                part += f" (week before {before:.1f})"
+            parts.append(part)
+        lines.append(f"{digest['checkins']} check-ins; average " + ', '.join(parts) + '.')
+    if digest['prayers_new']:
+        lines.append(f"{digest['prayers_new']} new prayer requests ({', '.join(digest['categories'])}).")
+    if digest['prayers_answered']:
+        lines.append(f"{digest['prayers_answered']} prayers answered this week.")
+    if digest['prayers_open']:
+        lines.append(f"{digest['prayers_open']} prayer requests still open.")
+    return '\n'.join(lines)
+
+def local_digest_encouragement(digest: Dict) -> str:
+    verses = find_relevant_verses(' '.join(digest['categories']) + ' work stress rest') or [get_daily_verse()]
+    verse = verses[0]
+    return f"**{verse['verse']}**: *\"{verse['text']}\"*\n\n{verse['application']}"
+
+@timed('ai.weekly_digest')
+def generate_digest_encouragement(digest: Dict, summary: str, api_key: Optional[str], client: MistralClient,
+                                  limiter: RateLimiter) -> tuple:
+    # Returns (text, source). Any failure falls back to a verse from the local
+    # library except an open circuit breaker, which stops the run so that a
+    # later run can pick up from the checkpoint.
+    if not api_key:
+        return local_digest_encouragement(digest), 'local'
+    
+    messages = [
+        {"role": "system", "content": DIGEST_SYSTEM_PROMPT},
+        {"role": "user", "content": f"My week starting {digest['week_start']}:\n{summary}"},
+    ]
+    headers, payload = _build_request(api_key, messages)
+    try:
+        limiter.acquire(digest['user_id'])
+        with client.post(headers, payload) as response:
+            if response.status_code == 200:
+                return response.json()['choices'][0]['message']['content'], 'ai'
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        logging.warning('Weekly digest for user %s fell back to a local verse: %s', digest['user_id'], e)
+    return local_digest_encouragement(digest), 'local'
+
+async def run_weekly_digests(week_start: Optional[datetime.date] = None, concurrency: int = DIGEST_CONCURRENCY,
+                             chunk_size: int = DIGEST_CHUNK_SIZE, full: bool = False,
+                             client: Optional[MistralClient] = None, limiter: Optional[RateLimiter] = None,
+                             log=print) -> Dict:
+    # Blocking HTTP calls run in worker threads, at most `concurrency` at a
+    # time, each after taking a token from the limiter. The next chunk of
+    # inputs is read while the current one is being written.
+    week_start = week_start or digest_week_start()
+    week = week_start.isoformat()
+    api_key = os.getenv('MISTRAL_API_KEY')
+    client = client or get_mistral_client()
+    # Waiting for a token is the point of a batch job, so it never times out.
+    limiter = limiter or RateLimiter(max_wait=float('inf'))
+    semaphore = asyncio.Semaphore(concurrency)
+    get_writer().flush()
     
-    conn.commit()
-    conn.close()
+    with get_db().connection() as conn:
+        if full:
+            conn.execute('DELETE FROM digest_checkpoints WHERE week_start = ?', (week,))
+        conn.execute('''
+            INSERT INTO digest_checkpoints (week_start, started_at) VALUES (?, ?)
+            ON CONFLICT (week_start) DO NOTHING
+        ''', (week, _utc_timestamp()))
+        conn.commit()
+        after_user_id, finished_at = conn.execute(
+            'SELECT last_user_id, finished_at FROM digest_checkpoints WHERE week_start = ?', (week,)
+        ).fetchone()
+    
+    result = {'week_start': week, 'resumed_after_user': after_user_id, 'users': 0, 'ai': 0, 'local': 0}
+    if finished_at:
+        log(f"Digests for the week of {week} were finished at {finished_at}; pass --full to rebuild them.")
+        return result
+    if after_user_id:
+        log(f"Resuming the week of {week} after user {after_user_id}.")
+    
+    async def build(digest):
+        summary = digest_summary(digest)
+        async with semaphore:
+            text, source = await asyncio.to_thread(
+                generate_digest_encouragement, digest, summary, api_key, client, limiter)
+        return (digest['user_id'], week, summary, text, source, _utc_timestamp())
+    
+    def save(last_user_id, rows):
+        with get_db().connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.executemany('''
+                    INSERT OR REPLACE INTO weekly_digests (user_id, week_start, summary, encouragement, source, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', rows)
+                conn.execute('UPDATE digest_checkpoints SET last_user_id = ? WHERE week_start = ?',
+                             (last_user_id, week))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+    
+    chunks = iter_digest_inputs(week_start, after_user_id, chunk_size)
+    next_chunk = asyncio.create_task(asyncio.to_thread(next, chunks, None))
+    while True:
+        chunk = await next_chunk
+        if chunk is None:
+            break
+        next_chunk = asyncio.create_task(asyncio.to_thread(next, chunks, None))
+        last_user_id, inputs = chunk
+        try:
+            rows = await asyncio.gather(*(build(digest) for digest in inputs))
+        except CircuitOpenError:
+            next_chunk.cancel()
+            log(f"Mistral is unavailable; stopped after user {after_user_id}. Run again to resume.")
+            result['stopped'] = True
+            return result
+        await asyncio.to_thread(save, last_user_id, rows)
+        after_user_id = last_user_id
+        result['users'] += len(rows)
+        for row in rows:
+            result[row[4]] += 1
+        log(f"Wrote {result['users']} digests, through user {last_user_id}.")
+    
+    with get_db().connection() as conn:
+        conn.execute('UPDATE digest_checkpoints SET finished_at = ? WHERE week_start = ?', (_utc_timestamp(), week))
+        conn.commit()
+    return result
+
+@timed()
+def get_latest_digest(user_id: int) -> Optional[Dict]:
+    # Not behind the read cache: digests are written by a separate process.
+    with get_db().connection() as conn:
+        row = conn.execute('''
+            SELECT week_start, summary, encouragement FROM weekly_digests
+            WHERE user_id = ? ORDER BY week_start DESC LIMIT 1
+        ''', (user_id,)).fetchone()
+    if not row:
+        return None
+    return {'week_start': row[0], 'summary': row[1], 'encouragement': row[2]}
+
+def check_admin_token(token: str) -> bool:
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8'))
 
 def main():
     init_database()
+    get_vacuum_worker()
     
     st.sidebar.title("✝️ WorkZen")
     st.sidebar.markdown("*Your Christian workplace stress companion*")
     
     if 'username' not in st.session_state:
         st.session_state.username = None
+        st.session_state.is_admin = False
     
     if not st.session_state.username:
         st.sidebar.subheader("Welcome!")
@@ -331,12 +3395,25 @@ def main():
         if st.sidebar.button("Logout"):
             st.session_state.username = None
             st.session_state.user_id = None
+            st.session_state.is_admin = False
             st.rerun()
+        if ADMIN_TOKEN and not st.session_state.is_admin:
+            with st.sidebar.expander("Admin"):
+                token = st.text_input("Admin token", type="password", key="admin_token")
+                if token:
+                    if check_admin_token(token):
+                        st.session_state.is_admin = True
+                        st.rerun()
+                    st.error("That token is not valid.")
     
     if st.session_state.username:
-        tab1, tab2, tab3, tab4 = st.tabs(["💬 Chat", "📊 Check-in", "🙏 Prayer", "📈 Progress"])
+        is_admin = st.session_state.is_admin
+        tab_labels = ["💬 Chat", "📊 Check-in", "🙏 Prayer", "📈 Progress", "🔎 Search"]
+        if is_admin:
+            tab_labels.append("📟 Metrics")
+        tab1, tab2, tab3, tab4, tab5, *admin_tabs = st.tabs(tab_labels, key="main_tab", on_change="rerun")
         
-        with tab1:
+        with tab1, timer('render.chat'):
             st.header("Chat with WorkZen")
             
             daily_verse = get_daily_verse()
@@ -347,7 +3424,8 @@ def main():
                 st.markdown(f"**Theme:** {daily_verse['theme']}")
             
             if 'messages' not in st.session_state:
-                st.session_state.messages = []
+                st.session_state.messages = deque(maxlen=CHAT_MEMORY_MESSAGES)
+                st.session_state.chat_earlier = {'pages': 0, 'before': None}
                 welcome_msg = f"""👋 Welcome to WorkZen, {st.session_state.username}! I'm here to provide biblical encouragement and practical support for your workplace challenges.
 
 Feel free to share:
@@ -357,30 +3435,73 @@ Feel free to share:
 • Questions about faith and work
 
 How can I support you today?"""
-                st.session_state.messages.append({"role": "assistant", "content": welcome_msg})
+                st.session_state.messages.append({"role": "assistant", "content": welcome_msg, "at": _utc_timestamp(),
+                                                  "welcome": True})
+            
+            # Turns older than the oldest one still in memory come from the
+            # database, a few pages at a time.
+            earlier = st.session_state.chat_earlier
+            before = earlier['before'] or (st.session_state.messages[0]['at'], 0)
+            earlier_rows = []
+            next_window = None
+            has_more = bool(get_conversation_page(st.session_state.user_id, before, 1))
+            for _ in range(earlier['pages']):
+                page = get_conversation_page(st.session_state.user_id, before, CHAT_PAGE_SIZE + 1)
+                has_more = len(page) > CHAT_PAGE_SIZE
+                page = page[:CHAT_PAGE_SIZE]
+                earlier_rows.extend(page)
+                if not has_more:
+                    break
+                before = (page[-1][3], page[-1][0])
+                next_window = next_window or before
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                if has_more and st.button("Load earlier messages", key="chat_load_earlier"):
+                    if earlier['pages'] < CHAT_EARLIER_MAX_PAGES:
+                        earlier['pages'] += 1
+                    else:
+                        # Slide the window back a page instead of growing it.
+                        earlier['before'] = next_window
+                    st.rerun()
+            with col2:
+                if earlier['pages'] and st.button("Hide earlier messages", key="chat_hide_earlier"):
+                    st.session_state.chat_earlier = {'pages': 0, 'before': None}
+                    st.rerun()
+            
+            for _, message, response, timestamp in reversed(earlier_rows):
+                with st.chat_message("user"):
+                    st.caption(timestamp[:16])
+                    st.markdown(message)
+                with st.chat_message("assistant"):
+                    st.markdown(response)
             
             for message in st.session_state.messages:
                 with st.chat_message(message["role"]):
                     st.markdown(message["content"])
             
             if prompt := st.chat_input("How can I pray for you and support you today?"):
-                st.session_state.messages.append({"role": "user", "content": prompt})
+                st.session_state.messages.append({"role": "user", "content": prompt, "at": _utc_timestamp()})
                 
                 context = {
                     "user_id": st.session_state.user_id,
-                    "recent_stress_level": 5,
-                    "time_of_day": datetime.datetime.now().hour
+                    "recent_stress_level": get_latest_stress_level(st.session_state.user_id),
+                    "time_of_day": datetime.datetime.now().hour,
+                    "history": list(st.session_state.messages)[:-1]
                 }
                 
-                with st.spinner("🙏 Praying and thinking..."):
-                    response = get_ai_response(prompt, context)
+                with st.chat_message("user"):
+                    st.markdown(prompt)
+                
+                with st.chat_message("assistant"):
+                    response = st.write_stream(stream_ai_response(prompt, context))
                 
-                st.session_state.messages.append({"role": "assistant", "content": response})
+                st.session_state.messages.append({"role": "assistant", "content": response, "at": _utc_timestamp()})
                 save_conversation(st.session_state.user_id, prompt, response)
                 
                 st.rerun()
         
-        with tab2:
+        with tab2, timer('render.checkin'):
             st.header("Daily Stress Check-in")
             
             col1, col2 = st.columns(2)
@@ -412,8 +3533,45 @@ How can I support you today?"""
                 }
                 save_stress_checkin(st.session_state.user_id, stress_data)
                 st.success("Check-in saved! 🎉 May God bless your day.")
+            
+            with st.expander("📦 Export or import your data"):
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    st.markdown("**Download your history**")
+                    formats = [fmt for fmt in EXPORT_FORMATS
+                               if fmt != 'parquet' or importlib.util.find_spec('pyarrow')]
+                    export_format = st.selectbox("Format", formats, key="export_format",
+                                                 help="JSONL includes everything; CSV and Parquet export one table")
+                    export_table = None
+                    if export_format != 'jsonl':
+                        export_table = st.selectbox("Table", list(EXPORT_TABLES), key="export_table")
+                    
+                    st.download_button(
+                        "Download my data",
+                        data=functools.partial(_export_to_tempfile, st.session_state.user_id,
+                                               export_format, export_table),
+                        file_name=f"workzen-{export_table or 'all'}.{export_format}",
+                        mime=EXPORT_MIME_TYPES[export_format],
+                        on_click="ignore"
+                    )
+                
+                with col2:
+                    st.markdown("**Import past check-ins**")
+                    uploaded = st.file_uploader("CSV or JSONL with date, morning_stress, evening_stress, "
+                                                "workload_rating, energy_level and notes",
+                                                type=["csv", "jsonl"], key="import_file")
+                    if uploaded and st.button("Import check-ins", key="import_checkins"):
+                        import_format = 'jsonl' if uploaded.name.endswith('.jsonl') else 'csv'
+                        # utf-8-sig drops the byte order mark Excel puts in front of the header.
+                        text = io.TextIOWrapper(uploaded, encoding='utf-8-sig', newline='')
+                        records = read_checkin_records(text, import_format)
+                        result = import_stress_checkins(st.session_state.user_id, records)
+                        st.success(f"Imported {result['imported']} check-ins.")
+                        for line_number, message in result['errors'][:10]:
+                            st.warning(f"Row {line_number}: {message}")
         
-        with tab3:
+        with tab3, timer('render.prayer'):
             st.header("🙏 Prayer Requests")
             
             tab3a, tab3b = st.tabs(["Submit Request", "My Prayers"])
@@ -424,8 +3582,7 @@ How can I support you today?"""
                 with st.form("prayer_request_form"):
                     request_text = st.text_area("What would you like prayer for?", 
                                                placeholder="Share your workplace challenges, concerns, or gratitudes...")
-                    category = st.selectbox("Category", 
-                                          ["work", "relationships", "health", "finances", "family", "other"])
+                    category = st.selectbox("Category", PRAYER_CATEGORIES)
                     
                     submitted = st.form_submit_button("Submit Prayer Request", type="primary")
                     
@@ -437,85 +3594,183 @@ How can I support you today?"""
             with tab3b:
                 st.subheader("My Prayer Requests")
                 
-                prayers = get_user_prayer_requests(st.session_state.user_id)
+                counts = get_prayer_request_counts(st.session_state.user_id)
                 
-                if prayers:
-                    for prayer in prayers:
-                        prayer_id, text, category, is_answered, answered_text, created_at, answered_at = prayer
+                if counts['total']:
+                    still_praying = counts['total'] - counts['answered']
+                    st.caption(f"{counts['total']} requests · {counts['answered']} answered · {still_praying} still praying")
+                    
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        category_filter = st.selectbox("Show category", ["all"] + PRAYER_CATEGORIES,
+                                                       key="prayer_filter_category")
+                    with col2:
+                        status_filter = st.selectbox("Show status", list(PRAYER_STATUS_FILTERS),
+                                                     key="prayer_filter_status")
+                    
+                    filters = (category_filter, status_filter)
+                    if st.session_state.get('prayer_filters') != filters:
+                        st.session_state.prayer_filters = filters
+                        st.session_state.prayer_pages = 1
+                    
+                    before = None
+                    has_more = False
+                    shown = 0
+                    for _ in range(st.session_state.prayer_pages):
+                        page = get_user_prayer_requests(
+                            st.session_state.user_id,
+                            limit=PRAYER_PAGE_SIZE + 1,
+                            before=before,
+                            category=None if category_filter == "all" else category_filter,
+                            answered=PRAYER_STATUS_FILTERS[status_filter]
+                        )
+                        has_more = len(page) > PRAYER_PAGE_SIZE
+                        page = page[:PRAYER_PAGE_SIZE]
                         
-                        with st.expander(f"{category.title()} - {created_at[:10]}"):
-                            st.write(f"**Request:** {text}")
+                        for prayer in page:
+                            prayer_id, text, category, is_answered, answered_text, created_at, answered_at = prayer
                             
-                            if is_answered:
-                                st.success("✅ Answered!")
-                                st.write(f"**Testimony:** {answered_text}")
-                                if answered_at:
-                                    st.write(f"**Answered on:** {answered_at[:10]}")
-                            else:
-                                st.info("🤲 Still praying...")
-                                answered_response = st.text_area("Mark as answered with testimony:", 
-                                                                key=f"answer_{prayer_id}")
-                                if st.button("Mark as Answered", key=f"btn_{prayer_id}"):
-                                    if answered_response:
-                                        mark_prayer_answered(prayer_id, answered_response)
-                                        st.success("Praise God! Prayer marked as answered! 🙌")
-                                        st.rerun()
+                            with st.expander(f"{category.title()} - {created_at[:10]}"):
+                                st.write(f"**Request:** {text}")
+                                
+                                if is_answered:
+                                    st.success("✅ Answered!")
+                                    st.write(f"**Testimony:** {answered_text}")
+                                    if answered_at:
+                                        st.write(f"**Answered on:** {answered_at[:10]}")
+                                else:
+                                    st.info("🤲 Still praying...")
+                                    answered_response = st.text_area("Mark as answered with testimony:", 
+                                                                    key=f"answer_{prayer_id}")
+                                    if st.button("Mark as Answered", key=f"btn_{prayer_id}"):
+                                        if answered_response:
+                                            mark_prayer_answered(prayer_id, answered_response)
+                                            st.success("Praise God! Prayer marked as answered! 🙌")
+                                            st.rerun()
+                        
+                        shown += len(page)
+                        if not has_more:
+                            break
+                        before = (page[-1][5], page[-1][0])
+                    
+                    if not shown:
+                        st.info("No prayer requests match these filters.")
+                    elif has_more and st.button("Load more", key="prayer_load_more"):
+                        st.session_state.prayer_pages += 1
+                        st.rerun()
                 else:
                     st.info("No prayer requests yet. Submit your first request above!")
         
         with tab4:
             st.header("Your Spiritual & Wellness Journey")
             
-            df = get_user_stress_history(st.session_state.user_id)
+            # Only the selected tab builds its charts; switching tabs reruns.
+            if tab4.open:
+                with timer('render.progress'):
+                    digest = get_latest_digest(st.session_state.user_id)
+                    if digest:
+                        with st.expander(f"📬 Weekly reflection for the week of {digest['week_start']}"):
+                            st.markdown(digest['summary'])
+                            st.markdown(digest['encouragement'])
+                    
+                    lifetime = get_stress_totals(st.session_state.user_id, datetime.date(1900, 1, 1),
+                                                 datetime.date.today())
+                    
+                    if lifetime['checkins']:
+                        range_label = st.selectbox("Time range", list(PROGRESS_RANGES), key="progress_range")
+                        start, end, grain = progress_window(range_label)
+                        
+                        totals = get_stress_totals(st.session_state.user_id, start, end)
+                        if totals['checkins']:
+                            for figure in build_progress_figures(st.session_state.user_id, start, end, grain):
+                                if figure is not None:
+                                    st.plotly_chart(figure, use_container_width=True)
+                            
+                            col1, col2, col3, col4 = st.columns(4)
+                            with col1:
+                                avg_morning = totals['morning_stress']['mean'] or 0.0
+                                st.metric("Avg Morning Stress", f"{avg_morning:.1f}")
+                            with col2:
+                                avg_evening = totals['evening_stress']['mean'] or 0.0
+                                st.metric("Avg Evening Stress", f"{avg_evening:.1f}")
+                            with col3:
+                                improvement = avg_morning - avg_evening
+                                st.metric("Daily Improvement", f"{improvement:+.1f}")
+                            with col4:
+                                st.metric("Total Check-ins", totals['checkins'])
+                            
+                            if improvement > 0:
+                                st.success("🙌 Praise God! Your stress levels are improving throughout the day. You're learning to cast your burdens on Him!")
+                            elif improvement < -1:
+                                st.info("💙 Your evenings show more stress than mornings. Consider ending your day with prayer and reflection.")
+                            else:
+                                st.info("📊 Your stress levels are fairly consistent. Keep tracking to identify patterns and growth opportunities.")
+                        else:
+                            st.info("No check-ins in this time range yet. Try a longer range to see your journey.")
+                            
+                    else:
+                        st.info("Complete your first check-in to see your progress and God's faithfulness in your journey!")
+                        
+                        st.markdown("---")
+                        st.markdown("### 📖 While You Get Started")
+                        verse = get_daily_verse()
+                        st.markdown(f"**{verse['verse']}**")
+                        st.markdown(f"*\"{verse['text']}\"*")
+        
+        with tab5, timer('render.search'):
+            st.header("🔎 Search Your Journey")
+            
+            search_query = st.text_input("Search your conversations, check-in notes and prayers",
+                                         key="search_query",
+                                         placeholder="e.g. manager, deadline, family")
             
-            if not df.empty:
-                df['date'] = pd.to_datetime(df['date'])
-                
-                fig = px.line(df, x='date', y=['morning_stress', 'evening_stress'],
-                             title='Stress Levels Over Time',
-                             labels={'value': 'Stress Level', 'date': 'Date'},
-                             color_discrete_map={
-                                 'morning_stress': '#ff6b6b',
-                                 'evening_stress': '#4ecdc4'
-                             })
-                st.plotly_chart(fig, use_container_width=True)
-                
-                fig2 = px.scatter(df, x='workload_rating', y='energy_level',
-                                 title='Workload vs Energy Level',
-                                 labels={'workload_rating': 'Workload', 'energy_level': 'Energy'},
-                                 color='morning_stress',
-                                 color_continuous_scale='RdYlGn_r')
-                st.plotly_chart(fig2, use_container_width=True)
+            if search_query:
+                results = search_user_history(st.session_state.user_id, search_query)
                 
-                col1, col2, col3, col4 = st.columns(4)
-                with col1:
-                    avg_morning = df['morning_stress'].mean()
-                    st.metric("Avg Morning Stress", f"{avg_morning:.1f}")
-                with col2:
-                    avg_evening = df['evening_stress'].mean()
-                    st.metric("Avg Evening Stress", f"{avg_evening:.1f}")
-                with col3:
-                    improvement = avg_morning - avg_evening
-                    st.metric("Daily Improvement", f"{improvement:+.1f}")
-                with col4:
-                    total_checkins = len(df)
-                    st.metric("Total Check-ins", total_checkins)
+                if results:
+                    st.caption(f"{len(results)} best matches")
+                    for result in results:
+                        st.markdown(f"**{result['source'].title()}** · {str(result['date'])[:10]}")
+                        st.markdown(result['snippet'])
+                        st.markdown("---")
+                else:
+                    st.info("Nothing found yet. Try a different word.")
+        
+        if is_admin:
+            with admin_tabs[0]:
+                st.header("📟 Performance")
                 
-                if improvement > 0:
-                    st.success("🙌 Praise God! Your stress levels are improving throughout the day. You're learning to cast your burdens on Him!")
-                elif improvement < -1:
-                    st.info("💙 Your evenings show more stress than mornings. Consider ending your day with prayer and reflection.")
+                if not METRICS_ENABLED:
+                    st.info("Timing is turned off. Unset WORKZEN_METRICS=0 to collect it.")
                 else:
-                    st.info("📊 Your stress levels are fairly consistent. Keep tracking to identify patterns and growth opportunities.")
+                    metrics = get_metrics()
+                    rows = metrics.summary()
+                    if rows:
+                        st.dataframe(pd.DataFrame(rows).round(2), hide_index=True)
+                    else:
+                        st.info("No timings recorded yet.")
                     
-            else:
-                st.info("Complete your first check-in to see your progress and God's faithfulness in your journey!")
-                
-                st.markdown("---")
-                st.markdown("### 📖 While You Get Started")
-                verse = get_daily_verse()
-                st.markdown(f"**{verse['verse']}**")
-                st.markdown(f"*\"{verse['text']}\"*")
+                    response_stats = get_response_cache().stats()
+                    read_stats = get_read_cache().stats()
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        st.metric("AI cache hit rate", f"{response_stats['hit_rate']:.0%}")
+                    with col2:
+                        st.metric("Read cache hit rate", f"{read_stats['hit_rate']:.0%}")
+                    with col3:
+                        st.metric("Read cache size", f"{read_stats['bytes'] / 1024 / 1024:.1f} MB")
+                    
+                    inflight = get_inflight_replies()
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.metric("AI calls in flight", len(inflight))
+                    with col2:
+                        st.metric("Duplicate prompts coalesced", inflight.coalesced)
+                    
+                    st.download_button("Download Prometheus metrics", data=metrics.to_prometheus(),
+                                       file_name="workzen-metrics.prom", mime="text/plain")
+                    if METRICS_FILE:
+                        st.caption(f"Also written to {METRICS_FILE} every {METRICS_FILE_INTERVAL:g} seconds.")
     
     else:
         st.title("✝️ WorkZen - Christian Workplace Stress Assistant")
@@ -0,0 +1,82 @@
+"""Crisis detection throughput: the old linear keyword loop vs CrisisDetector.
+
+    python benchmarks/bench_crisis.py --messages 200000 --extra-phrases 200
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BENIGN = (
+    "my manager moved the deadline again and the team is exhausted but I am trying to trust God "
+    "with the presentation tomorrow while juggling emails meetings and a long commute home"
+).split()
+
+OLD_KEYWORDS = ["suicide", "kill myself", "hopeless", "can't go on", "hurt myself", "end it all"]
+
+
+def make_messages(rng: random.Random, count: int, crisis_rate: float):
+    crisis = ["I feel hopeless at work", "some days I can't go on", "I keep thinking about ending it all"]
+    return [
+        rng.choice(crisis) if rng.random() < crisis_rate
+        else " ".join(rng.choices(BENIGN, k=rng.randint(10, 40)))
+        for _ in range(count)
+    ]
+
+
+def throughput(fn, messages) -> float:
+    start = time.perf_counter()
+    for message in messages:
+        fn(message)
+    return len(messages) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--crisis-rate", type=float, default=0.01)
+    parser.add_argument("--extra-phrases", type=int, default=200,
+                        help="synthetic phrases added to show how each approach scales with lexicon size")
+    parser.add_argument("--scan-rows", type=int, default=200_000, help="rows for the batch scan benchmark")
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ["WORKZEN_DB"] = os.path.join(tempfile.mkdtemp(prefix="workzen-bench-"), "crisis.db")
+    import app
+
+    rng = random.Random(args.seed)
+    messages = make_messages(rng, args.messages, args.crisis_rate)
+    extra = [f"synthetic phrase {i} alarm" for i in range(args.extra_phrases)]
+
+    lexicons = {
+        f"{len(app.CRISIS_LEXICON)} phrases": app.CRISIS_LEXICON,
+        f"{len(app.CRISIS_LEXICON) + len(extra)} phrases": app.CRISIS_LEXICON + extra,
+    }
+    print(f"{args.messages:,} messages, {args.crisis_rate:.0%} crisis")
+    for label, phrases in lexicons.items():
+        keywords = OLD_KEYWORDS + extra if len(phrases) > len(app.CRISIS_LEXICON) else OLD_KEYWORDS
+        linear = throughput(lambda m: any(k in m.lower() for k in keywords), messages)
+        detector = app.CrisisDetector(phrases)
+        compiled = throughput(detector.is_crisis, messages)
+        print(f"{label:>14}: linear any() {linear:>12,.0f} msg/s   detector {compiled:>12,.0f} msg/s")
+
+    app.init_database()
+    with app.get_db().connection() as conn:
+        conn.executemany(
+            "INSERT INTO conversations (user_id, message, response) VALUES (?, ?, ?)",
+            [(i % 500, messages[i % len(messages)], "") for i in range(args.scan_rows)],
+        )
+        conn.commit()
+    start = time.perf_counter()
+    flagged = app.scan_crisis_history(chunk_size=5000, full=True)
+    elapsed = time.perf_counter() - start
+    print(f"batch scan: {args.scan_rows:,} conversations in {elapsed:.2f}s "
+          f"({args.scan_rows / elapsed:,.0f} rows/s), {flagged['conversations']:,} flagged")
+
+
+if __name__ == "__main__":
+    main()
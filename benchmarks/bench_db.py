@@ -0,0 +1,101 @@
+"""Concurrent-writer throughput: per-call connect vs pooled Database vs write-behind queue.
+
+    python benchmarks/bench_db.py --threads 8 --ops 500
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run_threads(threads: int, ops: int, fn, finish=None) -> dict:
+    errors = []
+    barrier = threading.Barrier(threads)
+
+    def worker(worker_id):
+        barrier.wait()
+        for i in range(ops):
+            try:
+                fn(worker_id, i)
+            except sqlite3.OperationalError as e:
+                errors.append(str(e))
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    if finish:
+        finish()
+    elapsed = time.perf_counter() - start
+    total = threads * ops
+    return {
+        "ops": total,
+        "seconds": round(elapsed, 3),
+        "ops_per_sec": round((total - len(errors)) / elapsed, 1),
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=500, help="inserts per thread")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="workzen-bench-")
+    baseline_path = os.path.join(workdir, "baseline.db")
+    pooled_path = os.path.join(workdir, "pooled.db")
+    os.environ["WORKZEN_DB"] = pooled_path
+
+    import app
+
+    app.init_database()
+    # Same schema, created on a connection that keeps the default rollback journal.
+    baseline_db = app.Database(baseline_path)
+    with baseline_db.connection() as conn:
+        conn.execute("PRAGMA journal_mode=DELETE")
+        app.migrate(conn)
+    baseline_db.close()
+
+    def baseline_insert(worker_id, i):
+        conn = sqlite3.connect(baseline_path)
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO conversations (user_id, message, response) VALUES (?, ?, ?)",
+            (worker_id, f"message {i}", "response"),
+        )
+        conn.commit()
+        conn.close()
+
+    def pooled_insert(worker_id, i):
+        with app.get_db().connection() as conn:
+            conn.execute(
+                "INSERT INTO conversations (user_id, message, response) VALUES (?, ?, ?)",
+                (worker_id, f"message {i}", "response"),
+            )
+            conn.commit()
+
+    def queued_insert(worker_id, i):
+        app.save_conversation(worker_id, f"message {i}", "response")
+
+    print(f"{args.threads} threads x {args.ops} inserts")
+    variants = (
+        ("per-call connect", baseline_insert, None),
+        ("pooled WAL", pooled_insert, None),
+        ("write-behind", queued_insert, app.get_writer().flush),
+    )
+    for name, fn, finish in variants:
+        result = run_threads(args.threads, args.ops, fn, finish)
+        print(f"{name:>18}: {result['ops_per_sec']:>10} ops/s  "
+              f"{result['seconds']:>7}s  errors={result['errors']}")
+
+
+if __name__ == "__main__":
+    main()
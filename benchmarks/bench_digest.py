@@ -0,0 +1,55 @@
+"""Weekly digest job throughput against the local stub API at several concurrency levels.
+
+    python benchmarks/bench_digest.py --rows 100000 --latency 0.2 --concurrency 1 4 16
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tools"))
+
+from stub_mistral import start_stub_server
+from synthetic_data import populate, split_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=60, help="spread synthetic dates over this many days")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub seconds per completion")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--per-minute", type=float, default=3000, help="global completion rate limit")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    stub = start_stub_server(latency=args.latency)
+    os.environ["WORKZEN_DB"] = os.path.join(tempfile.mkdtemp(prefix="workzen-bench-"), "digest.db")
+    os.environ["MISTRAL_API_KEY"] = "bench"
+    os.environ["MISTRAL_API_URL"] = stub.url
+    import app
+
+    counts = split_rows(args.rows)
+    populate(app, counts["users"], counts["checkins"], counts["conversations"], counts["prayers"],
+             seed=args.seed, days=args.days, log=lambda line: print(line, file=sys.stderr))
+
+    print(f"{counts['users']} users, stub latency {args.latency * 1000:.0f} ms, "
+          f"limit {args.per_minute:g} completions/min")
+    print(f"{'concurrency':>12}{'digests':>10}{'seconds':>10}{'per second':>12}")
+    for concurrency in args.concurrency:
+        limiter = app.RateLimiter(global_per_minute=args.per_minute, global_burst=concurrency,
+                                  max_wait=float("inf"))
+        start = time.perf_counter()
+        result = asyncio.run(app.run_weekly_digests(concurrency=concurrency, full=True, limiter=limiter,
+                                                    log=lambda line: None))
+        seconds = time.perf_counter() - start
+        print(f"{concurrency:>12}{result['users']:>10}{seconds:>10.2f}{result['users'] / seconds:>12.1f}")
+    app.get_writer().close()
+
+
+if __name__ == "__main__":
+    main()
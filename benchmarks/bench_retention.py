@@ -0,0 +1,86 @@
+"""Space and read-time impact of archiving old conversations, before vs after.
+
+    python benchmarks/bench_retention.py --rows 200000 --older-than-days 365 --codec zlib
+"""
+import argparse
+import datetime
+import io
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_suite import measure, pick_users
+from synthetic_data import populate, split_rows
+
+
+def run_reads(app, users: dict, old_before: tuple, repeat: int) -> dict:
+    read_cache = app.get_read_cache()
+    now = (app._utc_timestamp(), 0)
+    results = {}
+    for label, user_id in users.items():
+        results[f"chat_page.recent.cold.{label}"] = measure(
+            lambda: app.get_conversation_page(user_id, now, app.CHAT_PAGE_SIZE + 1), repeat, 1, read_cache.clear)
+        results[f"chat_page.archived.cold.{label}"] = measure(
+            lambda: app.get_conversation_page(user_id, old_before, app.CHAT_PAGE_SIZE + 1), repeat, 1,
+            read_cache.clear)
+        results[f"chat_page.archived.warm.{label}"] = measure(
+            lambda: app.get_conversation_page(user_id, old_before, app.CHAT_PAGE_SIZE + 1), repeat, 1)
+        results[f"export_conversations.{label}"] = measure(
+            lambda: app.export_user_data(user_id, "jsonl", "conversations", io.BytesIO()), max(1, repeat // 4), 0)
+        results[f"search.{label}"] = measure(lambda: app.search_user_history(user_id, "deadline"), repeat, 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--older-than-days", type=int, default=365)
+    parser.add_argument("--codec", default="zlib", choices=["zlib", "zstd"])
+    parser.add_argument("--full-vacuum", action="store_true")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    os.environ["WORKZEN_DB"] = os.path.join(tempfile.mkdtemp(prefix="workzen-bench-"), "retention.db")
+    os.environ["WORKZEN_VACUUM_INTERVAL"] = "0"
+    import app
+
+    counts = split_rows(args.rows)
+    populate(app, counts["users"], counts["checkins"], counts["conversations"], counts["prayers"],
+             seed=args.seed, log=lambda line: print(line, file=sys.stderr))
+    app.compact_database(full=True)
+    users = pick_users(app)
+    old_day = datetime.date.today() - datetime.timedelta(days=args.older_than_days + 90)
+    old_before = (f"{old_day.isoformat()} 00:00:00", 0)
+
+    before = {"database": app.database_size(), "reads": run_reads(app, users, old_before, args.repeat)}
+    archived = app.archive_conversations(args.older_than_days, args.codec)
+    compacted = app.compact_database(full=args.full_vacuum)
+    after = {"database": compacted["after"], "reads": run_reads(app, users, old_before, args.repeat)}
+    app.get_writer().close()
+
+    print(f"{'benchmark':<42}{'before ms':>12}{'after ms':>12}{'ratio':>8}", file=sys.stderr)
+    for name, stats in after["reads"].items():
+        base = before["reads"][name]["median_ms"]
+        print(f"{name:<42}{base:>12.3f}{stats['median_ms']:>12.3f}{stats['median_ms'] / base:>8.2f}",
+              file=sys.stderr)
+    saved = before["database"]["bytes"] - after["database"]["bytes"]
+    print(f"database {before['database']['bytes'] / 1e6:.1f} MB -> {after['database']['bytes'] / 1e6:.1f} MB "
+          f"({saved / before['database']['bytes']:.0%} smaller), chunks compressed "
+          f"{archived['raw_bytes'] / max(archived['stored_bytes'], 1):.1f}x", file=sys.stderr)
+
+    report = {"args": vars(args), "users": users, "archived": archived, "before": before, "after": after}
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as handle:
+            handle.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
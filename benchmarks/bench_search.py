@@ -0,0 +1,77 @@
+"""FTS5 search vs LIKE '%...%' scans on a synthetic conversation corpus.
+
+    python benchmarks/bench_search.py --rows 2000000 --users 5000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_data import build_vocabulary, sentence
+
+QUERIES = ["manager", "deadline meeting", "layoff", "presentation client", "grateful"]
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    os.environ["WORKZEN_DB"] = os.path.join(tempfile.mkdtemp(prefix="workzen-bench-"), "search.db")
+    import app
+
+    rng = random.Random(args.seed)
+    vocabulary, cum_weights = build_vocabulary(rng)
+    app.init_database()
+    db = app.get_db()
+
+    start = time.perf_counter()
+    chunk = 50_000
+    with db.connection() as conn:
+        for offset in range(0, args.rows, chunk):
+            conn.executemany(
+                "INSERT INTO conversations (user_id, message, response) VALUES (?, ?, ?)",
+                [(rng.randint(1, args.users), sentence(rng, vocabulary, cum_weights),
+                  sentence(rng, vocabulary, cum_weights))
+                 for _ in range(min(chunk, args.rows - offset))],
+            )
+            conn.commit()
+    print(f"Loaded {args.rows:,} conversations for {args.users:,} users "
+          f"(FTS kept in sync by triggers) in {time.perf_counter() - start:.1f}s")
+
+    user_id = rng.randint(1, args.users)
+    print(f"{'query':<22}{'FTS user':>12}{'LIKE user':>12}{'FTS all':>12}{'LIKE all':>12}  (median ms)")
+    with db.connection() as conn:
+        for query in QUERIES:
+            match = app._fts_query(query)
+            pattern = f"%{query}%"
+            fts_user = timed(lambda: app.search_user_history(user_id, query), args.repeat)
+            like_user = timed(lambda: app._search_user_history_like(conn, user_id, query, 20), args.repeat)
+            fts_all = timed(lambda: conn.execute(
+                "SELECT rowid FROM conversations_fts WHERE conversations_fts MATCH ? ORDER BY rank LIMIT 20",
+                (match,)).fetchall(), args.repeat)
+            like_all = timed(lambda: conn.execute(
+                "SELECT id FROM conversations WHERE message LIKE ? OR response LIKE ? LIMIT 20",
+                (pattern, pattern)).fetchall(), args.repeat)
+            print(f"{query:<22}{fts_user:>12.2f}{like_user:>12.2f}{fts_all:>12.2f}{like_all:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Import-time budget for the logged-out landing page, measured with python -X importtime.
+
+    python benchmarks/bench_startup.py --runs 5 --out startup.json
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Importing the app and rendering the landing page must not load these; the
+# logged-in tabs pull them in on first use.
+DEFERRED_MODULES = ["pandas", "numpy", "plotly.express", "requests"]
+
+# Milliseconds of import time on the landing path, not counting streamlit
+# itself. Measured at about 125 ms, over half of it streamlit's emoji table
+# loaded for the page icon; the budget leaves room for slower machines.
+DEFAULT_BUDGET_MS = 250
+
+LANDING_SNIPPET = f"""
+import json, sys
+sys.path.insert(0, {ROOT!r})
+import app
+app.main()
+print(json.dumps([name for name in {DEFERRED_MODULES!r} if name in sys.modules]))
+"""
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+
+def parse_importtime(stderr: str) -> dict:
+    # Counts only what the app brings in: the app import itself and every
+    # top-level import after it (first-use imports during main()), minus
+    # streamlit. Interpreter startup (site, encodings) comes before it.
+    own = 0
+    streamlit = 0
+    seen_app = False
+    pending = {}
+    modules = {}
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative, depth, name = int(match.group(2)), len(match.group(3)) // 2, match.group(4)
+        if depth == 1:
+            # Children are reported before the import that pulled them in.
+            pending[name] = pending.get(name, 0) + cumulative
+        elif depth == 0:
+            seen_app = seen_app or name == "app"
+            if seen_app:
+                own += cumulative
+                modules.update(pending)
+                if name != "app":
+                    modules[name] = modules.get(name, 0) + cumulative
+            pending = {}
+        if name == "streamlit" and not streamlit:
+            streamlit = cumulative
+    return {"own_us": own - streamlit, "streamlit_us": streamlit, "modules_us": modules}
+
+
+def measure_once(workdir: str) -> dict:
+    env = dict(os.environ, WORKZEN_DB=os.path.join(workdir, "startup.db"), WORKZEN_METRICS_FILE="")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", LANDING_SNIPPET], cwd=workdir, env=env,
+                            capture_output=True, text=True, check=True)
+    parsed = parse_importtime(result.stderr)
+    parsed["loaded"] = json.loads(result.stdout.strip().splitlines()[-1])
+    return parsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="fail when the median import time beyond streamlit exceeds this")
+    parser.add_argument("--out", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="workzen-startup-")
+    # The first run also creates the database, so it is not counted.
+    measure_once(workdir)
+    runs = [measure_once(workdir) for _ in range(args.runs)]
+
+    own_ms = statistics.median(run["own_us"] / 1000 for run in runs)
+    loaded = sorted({name for run in runs for name in run["loaded"]})
+    slowest = sorted(runs[-1]["modules_us"].items(), key=lambda item: item[1], reverse=True)[:10]
+    report = {
+        "runs": args.runs,
+        "own_ms": round(own_ms, 1),
+        "streamlit_ms": round(statistics.median(run["streamlit_us"] / 1000 for run in runs), 1),
+        "budget_ms": args.budget_ms,
+        "deferred_modules_loaded": loaded,
+        "slowest_imports_ms": {name: round(us / 1000, 1) for name, us in slowest},
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as handle:
+            handle.write(text + "\n")
+
+    failures = []
+    if loaded:
+        failures.append(f"landing page imported {', '.join(loaded)}")
+    if own_ms > args.budget_ms:
+        failures.append(f"import time beyond streamlit is {own_ms:.0f} ms, budget {args.budget_ms:.0f} ms")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
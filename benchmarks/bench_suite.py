@@ -0,0 +1,218 @@
+"""Timings of WorkZen's main code paths on synthetic data, written as JSON.
+
+    python benchmarks/bench_suite.py --rows 100000 --out bench-$(git rev-parse --short HEAD).json
+    python benchmarks/bench_suite.py --compare bench-old.json bench-new.json
+"""
+import argparse
+import datetime
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tools"))
+
+from stub_mistral import start_stub_server
+from synthetic_data import populate, split_rows
+
+
+def measure(fn, repeat: int, warmup: int, setup=None) -> dict:
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {
+        "n": repeat,
+        "median_ms": round(samples[len(samples) // 2] * 1000, 4),
+        "p95_ms": round(samples[max(0, math.ceil(0.95 * len(samples)) - 1)] * 1000, 4),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 4),
+        "min_ms": round(samples[0] * 1000, 4),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def pick_users(app) -> dict:
+    # The heaviest user by check-ins and one from the middle of the curve.
+    with app.get_db().connection() as conn:
+        ranked = conn.execute('''
+            SELECT user_id FROM stress_checkins GROUP BY user_id ORDER BY COUNT(*) DESC
+        ''').fetchall()
+    if not ranked:
+        raise SystemExit("database has no check-ins; generate data first")
+    return {"heavy": ranked[0][0], "typical": ranked[len(ranked) // 2][0]}
+
+
+def run_suite(app, repeat: int, warmup: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    users = pick_users(app)
+    read_cache = app.get_read_cache()
+    writer = app.get_writer()
+    results = {}
+
+    def bench(name, fn, setup=None):
+        results[name] = measure(fn, repeat, warmup, setup)
+        print(f"{name:<50}{results[name]['median_ms']:>12.3f}{results[name]['p95_ms']:>12.3f}", file=sys.stderr)
+
+    print(f"{'benchmark':<50}{'median ms':>12}{'p95 ms':>12}", file=sys.stderr)
+
+    with app.get_db().connection() as conn:
+        usernames = [row[0] for row in conn.execute(
+            "SELECT username FROM users ORDER BY id LIMIT 1000").fetchall()]
+    new_users = itertools.count()
+    bench("get_or_create_user.existing", lambda: app.get_or_create_user(rng.choice(usernames)))
+    bench("get_or_create_user.new", lambda: app.get_or_create_user(f"bench-{seed}-{time.time_ns()}-{next(new_users)}"))
+
+    user_id = users["typical"]
+    today = datetime.date.today()
+    checkin = {"date": today, "morning_stress": 6, "evening_stress": 4, "workload_rating": 7,
+               "energy_level": 5, "notes": "benchmark check-in"}
+    bench("save_conversation", lambda: app.save_conversation(user_id, "bench message", "bench response"))
+    bench("save_conversation.durable", lambda: (
+        app.save_conversation(user_id, "bench message", "bench response"), writer.sync(user_id)))
+    bench("save_stress_checkin.durable", lambda: (
+        app.save_stress_checkin(user_id, checkin), writer.sync(user_id)))
+    bench("save_prayer_request.durable", lambda: (
+        app.save_prayer_request(user_id, "bench prayer", "work"), writer.sync(user_id)))
+    writer.flush()
+
+    for label, uid in users.items():
+        bench(f"get_user_stress_history.cold.{label}", lambda: app.get_user_stress_history(uid), read_cache.clear)
+        bench(f"get_user_prayer_requests.first_page.cold.{label}",
+              lambda: app.get_user_prayer_requests(uid, limit=app.PRAYER_PAGE_SIZE + 1), read_cache.clear)
+        bench(f"get_user_prayer_requests.all.cold.{label}", lambda: app.get_user_prayer_requests(uid),
+              read_cache.clear)
+    bench("get_user_stress_history.warm.heavy", lambda: app.get_user_stress_history(users["heavy"]))
+
+    def progress(uid, range_label):
+        start, end, grain = app.progress_window(range_label)
+        app.get_stress_totals(uid, start, end)
+        app.build_progress_figures(uid, start, end, grain)
+
+    for range_label in ("Last 30 days", "All time", "All time (daily)"):
+        key = range_label.lower().replace(" (", "_").replace(")", "").replace(" ", "_")
+        bench(f"progress.prepare.cold.heavy.{key}", lambda: progress(users["heavy"], range_label), read_cache.clear)
+    bench("progress.prepare.warm.heavy.all_time", lambda: progress(users["heavy"], "All time"))
+
+    verse_index = app.get_verse_index()
+    bench("verse_index.search", lambda: verse_index.search(
+        "My manager moved the deadline again and I'm anxious I'll lose my job"))
+
+    context = {"user_id": user_id, "recent_stress_level": 6, "time_of_day": 9, "history": []}
+    prompts = itertools.count()
+    bench("get_ai_response.miss", lambda: app.get_ai_response(f"My deadline is tomorrow ({next(prompts)})", context))
+    bench("get_ai_response.hit", lambda: app.get_ai_response("My deadline is tomorrow", context))
+    bench("stream_ai_response.miss", lambda: "".join(
+        app.stream_ai_response(f"My manager keeps moving the goalposts ({next(prompts)})", context)))
+
+    writer.flush()
+    return {"users": users, "results": results}
+
+
+def compare(base_path: str, new_path: str, threshold: float) -> int:
+    with open(base_path) as handle:
+        base = json.load(handle)
+    with open(new_path) as handle:
+        new = json.load(handle)
+
+    print(f"{base['meta'].get('commit')} -> {new['meta'].get('commit')}  (median ms)")
+    print(f"{'benchmark':<50}{'base':>12}{'new':>12}{'ratio':>8}")
+    regressions = 0
+    for name, stats in new["results"].items():
+        before = base["results"].get(name)
+        if not before:
+            print(f"{name:<50}{'-':>12}{stats['median_ms']:>12.3f}")
+            continue
+        ratio = stats["median_ms"] / before["median_ms"] if before["median_ms"] else float("inf")
+        flag = "  REGRESSION" if ratio > threshold else ""
+        regressions += bool(flag)
+        print(f"{name:<50}{before['median_ms']:>12.3f}{stats['median_ms']:>12.3f}{ratio:>8.2f}{flag}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000, help="synthetic rows to generate (1k to 10M)")
+    parser.add_argument("--db", help="reuse a database filled by synthetic_data.py instead of generating one")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="write JSON here instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="compare two result files")
+    parser.add_argument("--threshold", type=float, default=1.25, help="median ratio reported as a regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(*args.compare, args.threshold))
+
+    stub = start_stub_server(chunk_delay=0.0)
+    os.environ["WORKZEN_DB"] = args.db or os.path.join(tempfile.mkdtemp(prefix="workzen-bench-"), "suite.db")
+    os.environ["MISTRAL_API_KEY"] = "bench"
+    os.environ["MISTRAL_API_URL"] = stub.url
+    # The suite calls the stub far faster than any real user could.
+    os.environ.setdefault("WORKZEN_AI_GLOBAL_PER_MINUTE", "1000000")
+    os.environ.setdefault("WORKZEN_AI_GLOBAL_BURST", "1000")
+    os.environ.setdefault("WORKZEN_AI_USER_PER_MINUTE", "1000000")
+    os.environ.setdefault("WORKZEN_AI_USER_BURST", "1000")
+    import app
+
+    load = None
+    if not args.db:
+        counts = split_rows(args.rows)
+        load = populate(app, counts["users"], counts["checkins"], counts["conversations"], counts["prayers"],
+                        seed=args.seed, log=lambda line: print(line, file=sys.stderr))
+
+    suite = run_suite(app, args.repeat, args.warmup, args.seed)
+    app.get_writer().close()
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "metrics_enabled": app.METRICS_ENABLED,
+            "rows": args.rows if not args.db else None,
+            "db": args.db,
+            "repeat": args.repeat,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "users": suite["users"],
+            "load": load,
+        },
+        "results": suite["results"],
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as handle:
+            handle.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""Fill a WorkZen database with synthetic users, check-ins, conversations and prayers.
+
+    python benchmarks/synthetic_data.py --db /tmp/workzen-synth.db --rows 1000000
+    python benchmarks/synthetic_data.py --db /tmp/workzen-synth.db --users 500 --checkins 50000 --conversations 20000 --prayers 5000
+"""
+import argparse
+import datetime
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = (
+    "work manager deadline meeting project team stress prayer family rest anxious tired grateful "
+    "boss coworker email overtime review promotion conflict peace hope strength weary burden "
+    "faith patience schedule client budget report presentation layoff commute office remote"
+).split()
+
+SYLLABLES = ["ka", "lo", "mi", "ren", "tu", "sa", "vel", "do", "pri", "en", "sh", "ar", "qua", "ti"]
+
+CATEGORIES = ["work", "relationships", "health", "finances", "family", "other"]
+
+# How --rows is split across the tables, and one user per this many rows.
+ROW_SHARES = {"checkins": 0.4, "conversations": 0.4, "prayers": 0.2}
+ROWS_PER_USER = 1000
+
+
+def build_vocabulary(rng: random.Random, size: int = 20000):
+    # Zipf-like word frequencies: filler words dominate and the real
+    # workplace words sit at ranks from common to rare, as in real text.
+    filler = list({"".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(size * 2)})
+    vocabulary = filler[:size]
+    for i, word in enumerate(WORDS):
+        vocabulary.insert(50 + i * 400, word)
+    weights = [1.0 / rank for rank in range(1, len(vocabulary) + 1)]
+    return vocabulary, list(itertools.accumulate(weights))
+
+
+def sentence(rng: random.Random, vocabulary, cum_weights) -> str:
+    return " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(8, 24)))
+
+
+def split_rows(rows: int) -> dict:
+    counts = {table: int(rows * share) for table, share in ROW_SHARES.items()}
+    counts["users"] = max(10, rows // ROWS_PER_USER)
+    return counts
+
+
+def _chunked(rows, size: int):
+    iterator = iter(rows)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# Deterministic row source for one seed. Activity is skewed the way real
+# usage is: user 1 is the heaviest and the rest follow a 1/rank**0.8 curve,
+# so benchmarks can pick a heavy and a typical user. Dates are spread over
+# the last `days` days.
+class Generator:
+    def __init__(self, users: int, seed: int = 7, days: int = 730, today: datetime.date = None):
+        self.rng = random.Random(seed)
+        self.users = users
+        self.days = days
+        self.today = today or datetime.date.today()
+        self.vocabulary, self.cum_weights = build_vocabulary(self.rng)
+        self.user_cum_weights = list(itertools.accumulate(1.0 / rank ** 0.8 for rank in range(1, users + 1)))
+        self.user_ids = range(1, users + 1)
+
+    def user(self) -> int:
+        return self.rng.choices(self.user_ids, cum_weights=self.user_cum_weights)[0]
+
+    def text(self) -> str:
+        return sentence(self.rng, self.vocabulary, self.cum_weights)
+
+    def day(self) -> datetime.date:
+        return self.today - datetime.timedelta(days=self.rng.randrange(self.days))
+
+    def timestamp(self) -> str:
+        moment = datetime.datetime.combine(self.day(), datetime.time()) + datetime.timedelta(
+            seconds=self.rng.randrange(86400))
+        return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+    def level(self) -> int:
+        return min(10, max(1, round(self.rng.gauss(5.5, 2))))
+
+    def checkins(self, count: int):
+        for _ in range(count):
+            yield (self.user(), self.day().isoformat(), self.level(), self.level(), self.level(), self.level(),
+                   self.text() if self.rng.random() < 0.6 else "")
+
+    def conversations(self, count: int):
+        for _ in range(count):
+            yield self.user(), self.text(), self.text(), self.timestamp()
+
+    def prayers(self, count: int):
+        for _ in range(count):
+            created_at = self.timestamp()
+            if self.rng.random() < 0.3:
+                yield (self.user(), self.text(), self.rng.choice(CATEGORIES), True, self.text(), created_at,
+                       created_at)
+            else:
+                yield self.user(), self.text(), self.rng.choice(CATEGORIES), False, None, created_at, None
+
+
+INSERTS = {
+    "checkins": '''
+        INSERT INTO stress_checkins (user_id, date, morning_stress, evening_stress, workload_rating, energy_level, notes)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''',
+    "conversations": '''
+        INSERT INTO conversations (user_id, message, response, timestamp)
+        VALUES (?, ?, ?, ?)
+    ''',
+    "prayers": '''
+        INSERT INTO prayer_requests (user_id, request_text, category, is_answered, answered_text, created_at, answered_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''',
+}
+
+
+def populate(app, users: int, checkins: int = 0, conversations: int = 0, prayers: int = 0, seed: int = 7,
+             days: int = 730, chunk_size: int = 50_000, log=print) -> dict:
+    # Search triggers stay active, so the FTS index is kept in sync while
+    # loading. New users get fresh ids, so an existing database can be grown.
+    generator = Generator(users, seed=seed, days=days)
+    app.init_database()
+    db = app.get_db()
+    timings = {}
+
+    start = time.perf_counter()
+    with db.connection() as conn:
+        first_id = (conn.execute("SELECT COALESCE(MAX(id), 0) FROM users").fetchone()[0]) + 1
+        conn.executemany("INSERT INTO users (id, username) VALUES (?, ?)",
+                         [(first_id + n, f"synthetic-{first_id + n}") for n in range(users)])
+        conn.commit()
+    timings["users"] = time.perf_counter() - start
+    # Generated user numbers are 1-based; shift them onto the inserted ids.
+    offset = first_id - 1
+
+    for table, count in (("checkins", checkins), ("conversations", conversations), ("prayers", prayers)):
+        start = time.perf_counter()
+        rows = getattr(generator, table)(count)
+        with db.connection() as conn:
+            for chunk in _chunked(rows, chunk_size):
+                conn.executemany(INSERTS[table], [(row[0] + offset,) + row[1:] for row in chunk])
+                conn.commit()
+        timings[table] = time.perf_counter() - start
+        if count:
+            log(f"{table:<14}{count:>12,} rows in {timings[table]:.1f}s")
+
+    start = time.perf_counter()
+    app.rebuild_stress_rollups()
+    timings["rollups"] = time.perf_counter() - start
+
+    return {
+        "rows": {"users": users, "checkins": checkins, "conversations": conversations, "prayers": prayers},
+        "seconds": {name: round(seconds, 3) for name, seconds in timings.items()},
+        "first_user_id": first_id,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", required=True, help="database file to create or extend")
+    parser.add_argument("--rows", type=int, help="total rows, split 40/40/20 across check-ins, "
+                                                 "conversations and prayers with one user per 1000 rows")
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--checkins", type=int, default=0)
+    parser.add_argument("--conversations", type=int, default=0)
+    parser.add_argument("--prayers", type=int, default=0)
+    parser.add_argument("--days", type=int, default=730, help="spread dates over this many past days")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    counts = split_rows(args.rows) if args.rows else {
+        "users": 100, "checkins": args.checkins, "conversations": args.conversations, "prayers": args.prayers,
+    }
+    if args.users:
+        counts["users"] = args.users
+
+    os.environ["WORKZEN_DB"] = args.db
+    import app
+
+    result = populate(app, counts["users"], counts["checkins"], counts["conversations"], counts["prayers"],
+                      seed=args.seed, days=args.days)
+    app.get_writer().close()
+    print(f"Loaded {sum(result['rows'].values()):,} rows into {args.db} "
+          f"in {sum(result['seconds'].values()):.1f}s")
+
+
+if __name__ == "__main__":
+    main()
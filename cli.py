@@ -0,0 +1,185 @@
+"""WorkZen maintenance commands.
+
+    python cli.py rebuild-rollups [--user-id N]
+    python cli.py rebuild-search
+    python cli.py scan-crisis [--chunk-size N] [--full]
+    python cli.py export --username NAME [--format jsonl|csv|parquet] [--table T] [-o FILE]
+    python cli.py import --username NAME FILE [--format csv|jsonl]
+    python cli.py weekly-digest [--week YYYY-MM-DD] [--concurrency N] [--chunk-size N] [--full]
+    python cli.py archive-conversations [--older-than-days N] [--codec zlib|zstd] [--no-vacuum | --full-vacuum]
+"""
+import argparse
+import asyncio
+import datetime
+import sys
+
+import app
+
+
+def cmd_rebuild_rollups(args):
+    app.init_database()
+    app.rebuild_stress_rollups(args.user_id)
+    scope = f"user {args.user_id}" if args.user_id is not None else "all users"
+    print(f"Rebuilt daily, weekly and monthly stress rollups for {scope}.")
+    return 0
+
+
+def cmd_rebuild_search(args):
+    app.init_database()
+    app.rebuild_search_index()
+    print("Rebuilt full-text search indexes from conversations, check-in notes and prayer requests.")
+    return 0
+
+
+def cmd_scan_crisis(args):
+    app.init_database()
+    flagged = app.scan_crisis_history(chunk_size=args.chunk_size, full=args.full)
+    for source, count in flagged.items():
+        print(f"{source}: {count} flagged")
+    return 0
+
+
+def _resolve_user(args) -> int:
+    if args.user_id is not None:
+        return args.user_id
+    return app.get_or_create_user(args.username)
+
+
+def _existing_user(args):
+    # Exports must not create an account for a mistyped name.
+    if args.user_id is not None:
+        return args.user_id if app.user_exists(args.user_id) else None
+    return app.find_user(args.username)
+
+
+def cmd_export(args):
+    app.init_database()
+    user_id = _existing_user(args)
+    if user_id is None:
+        print(f"No such user: {args.username or args.user_id}", file=sys.stderr)
+        return 1
+    if args.output == "-":
+        app.export_user_data(user_id, args.format, args.table, sys.stdout.buffer)
+        sys.stdout.buffer.flush()
+    else:
+        with open(args.output, "wb") as out:
+            app.export_user_data(user_id, args.format, args.table, out)
+        print(f"Exported user {user_id} to {args.output}", file=sys.stderr)
+    return 0
+
+
+def cmd_import(args):
+    app.init_database()
+    user_id = _resolve_user(args)
+    fmt = args.format or ("jsonl" if args.path.endswith(".jsonl") else "csv")
+    with open(args.path, encoding="utf-8-sig", newline="") as f:
+        result = app.import_stress_checkins(user_id, app.read_checkin_records(f, fmt), chunk_size=args.chunk_size)
+    print(f"Imported {result['imported']} check-ins for user {user_id}")
+    for line_number, message in result["errors"]:
+        print(f"  row {line_number}: {message}", file=sys.stderr)
+    return 1 if result["errors"] and not result["imported"] else 0
+
+
+def cmd_weekly_digest(args):
+    app.init_database()
+    if args.week:
+        week_start = args.week - datetime.timedelta(days=args.week.weekday())
+    else:
+        week_start = app.digest_week_start()
+    result = asyncio.run(app.run_weekly_digests(week_start, concurrency=args.concurrency,
+                                                chunk_size=args.chunk_size, full=args.full))
+    print(f"Week of {result['week_start']}: {result['users']} digests written "
+          f"({result['ai']} from Mistral, {result['local']} from the local verse library)")
+    return 1 if result.get("stopped") else 0
+
+
+def _megabytes(size: int) -> str:
+    return f"{size / 1024 / 1024:.1f} MB"
+
+
+def cmd_archive_conversations(args):
+    app.init_database()
+    before = app.database_size()
+    result = app.archive_conversations(args.older_than_days, args.codec)
+    print(f"Archived {result['turns']} turns older than {result['cutoff']} for {result['users']} users "
+          f"into {result['chunks']} {result['codec']} chunks")
+    if result["chunks"]:
+        print(f"  chunks: {_megabytes(result['raw_bytes'])} of JSON stored in {_megabytes(result['stored_bytes'])} "
+              f"({result['raw_bytes'] / max(result['stored_bytes'], 1):.1f}x)")
+    if args.no_vacuum:
+        print(f"  database: {_megabytes(before['bytes'])}, {_megabytes(app.database_size()['free_bytes'])} "
+              "now free for reuse")
+        return 0
+    compacted = app.compact_database(full=args.full_vacuum)
+    if compacted["full_vacuum"] and not before["incremental_vacuum"]:
+        print("  switched the database to incremental auto-vacuum (one-time full VACUUM)")
+    print(f"  database: {_megabytes(before['bytes'])} -> {_megabytes(compacted['after']['bytes'])}")
+    return 0
+
+
+def _add_user_arguments(parser: argparse.ArgumentParser):
+    user = parser.add_mutually_exclusive_group(required=True)
+    user.add_argument("--username")
+    user.add_argument("--user-id", type=int)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="workzen", description="WorkZen maintenance commands.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser("rebuild-rollups", help="recompute stress rollup tables from raw check-ins")
+    rebuild.add_argument("--user-id", type=int, help="only rebuild this user's rollups")
+    rebuild.set_defaults(func=cmd_rebuild_rollups)
+
+    search = commands.add_parser("rebuild-search", help="backfill the full-text search indexes from existing rows")
+    search.set_defaults(func=cmd_rebuild_search)
+
+    crisis = commands.add_parser("scan-crisis", help="flag stored entries that contain crisis language")
+    crisis.add_argument("--chunk-size", type=int, default=5000)
+    crisis.add_argument("--full", action="store_true", help="rescan from the start instead of the last checkpoint")
+    crisis.set_defaults(func=cmd_scan_crisis)
+
+    export = commands.add_parser("export", help="stream one user's data as JSONL, CSV or Parquet")
+    _add_user_arguments(export)
+    export.add_argument("--format", choices=app.EXPORT_FORMATS, default="jsonl")
+    export.add_argument("--table", choices=list(app.EXPORT_TABLES),
+                        help="table to export (required for CSV and Parquet, default stress_checkins)")
+    export.add_argument("-o", "--output", default="-", help="output file, or - for stdout")
+    export.set_defaults(func=cmd_export)
+
+    load = commands.add_parser("import", help="bulk-load historic check-ins for one user")
+    _add_user_arguments(load)
+    load.add_argument("path")
+    load.add_argument("--format", choices=["csv", "jsonl"])
+    load.add_argument("--chunk-size", type=int, default=1000)
+    load.set_defaults(func=cmd_import)
+
+    digest = commands.add_parser("weekly-digest", help="write a weekly reflection digest for every active user")
+    digest.add_argument("--week", type=datetime.date.fromisoformat,
+                        help="any day in the week to digest (default: last full week)")
+    digest.add_argument("--concurrency", type=int, default=app.DIGEST_CONCURRENCY,
+                        help="completion requests in flight at once")
+    digest.add_argument("--chunk-size", type=int, default=app.DIGEST_CHUNK_SIZE)
+    digest.add_argument("--full", action="store_true", help="rebuild the week instead of resuming its checkpoint")
+    digest.set_defaults(func=cmd_weekly_digest)
+
+    archive = commands.add_parser("archive-conversations",
+                                  help="move old conversations into compressed monthly chunks and reclaim space")
+    archive.add_argument("--older-than-days", type=int, default=app.RETENTION_DAYS)
+    archive.add_argument("--codec", choices=app.ARCHIVE_CODECS, default=app.ARCHIVE_CODEC)
+    archive.add_argument("--no-vacuum", action="store_true",
+                         help="leave freed pages for reuse instead of returning them to the filesystem")
+    archive.add_argument("--full-vacuum", action="store_true",
+                         help="rewrite the whole database to repack partly emptied pages")
+    archive.set_defaults(func=cmd_archive_conversations)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tools"))
+
+# app reads its settings when it is imported, so point it at a scratch
+# database and turn off the background writers first.
+os.environ["WORKZEN_DB"] = os.path.join(tempfile.mkdtemp(prefix="workzen-tests-"), "workzen.db")
+os.environ["WORKZEN_METRICS_FILE"] = ""
+os.environ["WORKZEN_VACUUM_INTERVAL"] = "0"
+# Tests call the stub far faster than any real user could.
+os.environ["WORKZEN_AI_GLOBAL_PER_MINUTE"] = "1000000"
+os.environ["WORKZEN_AI_GLOBAL_BURST"] = "1000"
+os.environ["WORKZEN_AI_USER_PER_MINUTE"] = "1000000"
+os.environ["WORKZEN_AI_USER_BURST"] = "1000"
+os.environ.pop("MISTRAL_API_KEY", None)
+
+from stub_mistral import start_stub_server  # noqa: E402
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(**options):
+        server = start_stub_server(**options)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
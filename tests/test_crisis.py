@@ -0,0 +1,36 @@
+import pytest
+
+import app
+
+detector = app.CrisisDetector(app.CRISIS_LEXICON)
+
+
+@pytest.mark.parametrize("text", [
+    "I said 'I want to end it all'",
+    "I feel 'hopeless'",
+    '"kill myself" is all I can think',
+    "I can’t go on like this",
+    "I can‘t go on",
+    "I cannot go on",
+    "I've been thinking about self-harm",
+    "I keep hurting my-self",
+    "I keep thinking about killing myself",
+    "Sometimes I feel SUICIDAL.",
+])
+def test_crisis_phrases_are_detected(text):
+    assert detector.is_crisis(text)
+
+
+@pytest.mark.parametrize("text", [
+    "My deadline is killing me",
+    "I can't go to the meeting",
+    "Self-care has helped with hope",
+    "",
+    None,
+])
+def test_ordinary_messages_are_not_flagged(text):
+    assert not detector.is_crisis(text)
+
+
+def test_quoted_crisis_message_gets_the_crisis_response():
+    assert app.get_ai_response("I feel 'hopeless'", {"history": []}) == app.CRISIS_RESPONSE
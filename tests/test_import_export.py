@@ -0,0 +1,60 @@
+import datetime
+import io
+
+import pytest
+
+import app
+import cli
+
+
+def test_checkin_values_must_be_whole_numbers():
+    assert app._validate_checkin({"date": "2024-03-01", "morning_stress": "7.0"})["morning_stress"] == 7
+
+    with pytest.raises(ValueError, match="whole number"):
+        app._validate_checkin({"date": "2024-03-01", "morning_stress": "3.7"})
+
+
+def test_csv_import_keeps_newlines_inside_quoted_notes():
+    user_id = app.get_or_create_user("import-newlines")
+    data = io.BytesIO(b'date,morning_stress,notes\r\n2024-03-01,5,"first line\r\nsecond line"\r\n')
+
+    records = app.read_checkin_records(io.TextIOWrapper(data, encoding="utf-8", newline=""), "csv")
+    result = app.import_stress_checkins(user_id, records)
+
+    assert result == {"imported": 1, "errors": []}
+    app.get_writer().sync(user_id)
+    with app.get_db().connection() as conn:
+        notes = conn.execute("SELECT notes FROM stress_checkins WHERE user_id = ?", (user_id,)).fetchall()
+    assert notes == [("first line\r\nsecond line",)]
+
+
+def test_export_of_unknown_user_fails_without_creating_it(capsys):
+    assert cli.main(["export", "--username", "no-such-user", "-o", "-"]) == 1
+    assert cli.main(["export", "--user-id", "987654", "-o", "-"]) == 1
+
+    assert "No such user" in capsys.readouterr().err
+    assert app.find_user("no-such-user") is None
+
+
+def test_app_picks_up_an_import_from_another_process(monkeypatch):
+    user_id = app.get_or_create_user("import-elsewhere")
+    app.save_stress_checkin(user_id, {"date": "2024-03-01", "morning_stress": 4})
+    start, end = datetime.date(2024, 3, 1), datetime.date(2024, 3, 31)
+    assert app.get_stress_totals(user_id, start, end)["checkins"] == 1
+
+    # cli.py runs with its own read cache, so its bump never reaches the app's.
+    app_cache = app.get_read_cache()
+    monkeypatch.setattr(app, "get_read_cache", lambda: app.ReadCache())
+    app.import_stress_checkins(user_id, [{"date": "2024-03-02", "morning_stress": "6"}])
+    monkeypatch.setattr(app, "get_read_cache", lambda: app_cache)
+    monkeypatch.setattr(app, "READ_CACHE_EXTERNAL_CHECK", 0)
+
+    assert app.get_stress_totals(user_id, start, end)["checkins"] == 2
+
+
+def test_cli_import_accepts_an_excel_csv_with_a_byte_order_mark(tmp_path, capsys):
+    path = tmp_path / "excel.csv"
+    path.write_bytes("date,morning_stress,notes\r\n2024-03-01,5,from Excel\r\n".encode("utf-8-sig"))
+
+    assert cli.main(["import", "--username", "import-bom", str(path)]) == 0
+    assert "Imported 1 check-ins" in capsys.readouterr().out
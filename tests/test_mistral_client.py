@@ -0,0 +1,68 @@
+import time
+
+import pytest
+import requests
+
+import app
+
+
+def make_client(url, **options):
+    options.setdefault("backoff_base", 0.001)
+    options.setdefault("timeout", (1, 2))
+    return app.MistralClient(url, **options)
+
+
+def post(client):
+    return client.post({"Content-Type": "application/json"}, {"messages": []})
+
+
+@pytest.mark.parametrize("status", [503, 429])
+def test_retry_honours_retry_after(stub, status):
+    server = stub(fail_first=1, error_status=status, retry_after=1)
+    client = make_client(server.url)
+
+    start = time.monotonic()
+    response = post(client)
+
+    assert response.status_code == 200
+    assert server.requests_seen == 2
+    assert time.monotonic() - start >= 1.0
+
+
+def test_retry_after_beyond_backoff_max_fails_fast(stub):
+    server = stub(fail_first=5, error_status=503, retry_after=30)
+    client = make_client(server.url, backoff_max=1.0)
+
+    start = time.monotonic()
+    response = post(client)
+
+    assert response.status_code == 503
+    assert server.requests_seen == 1
+    assert time.monotonic() - start < 1.0
+
+
+def test_breaker_opens_then_half_open_trial_closes_it(stub):
+    server = stub(fail_first=2, error_status=500)
+    breaker = app.CircuitBreaker(failure_threshold=2, reset_timeout=0.2)
+    client = make_client(server.url, max_retries=0, breaker=breaker)
+
+    assert post(client).status_code == 500
+    assert post(client).status_code == 500
+    assert breaker.state == "open"
+    with pytest.raises(app.CircuitOpenError):
+        post(client)
+    assert server.requests_seen == 2
+
+    time.sleep(0.25)
+    assert post(client).status_code == 200
+    assert breaker.state == "closed"
+    assert server.requests_seen == 3
+
+
+def test_timeout_under_injected_latency(stub):
+    server = stub(latency=0.5)
+    client = make_client(server.url, max_retries=0, timeout=(1, 0.1))
+
+    with pytest.raises(requests.Timeout):
+        post(client)
+    assert client.breaker.failures == 1
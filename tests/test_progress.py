@@ -0,0 +1,30 @@
+import datetime
+
+import app
+
+
+def checkin(day, **ratings):
+    return {"date": day, "morning_stress": 7, "evening_stress": 5, "workload_rating": 8, "energy_level": 4,
+            **ratings}
+
+
+def test_empty_range_builds_no_figures():
+    user_id = app.get_or_create_user("progress-empty-range")
+    today = datetime.date(2024, 6, 30)
+    app.save_stress_checkin(user_id, checkin(today - datetime.timedelta(days=90)))
+
+    start, end, grain = app.progress_window("Last 30 days", today)
+
+    assert app.get_stress_totals(user_id, start, end)["checkins"] == 0
+    assert app.build_progress_figures(user_id, start, end, grain) == (None, None)
+
+
+def test_range_without_workload_ratings_still_plots_the_trend():
+    user_id = app.get_or_create_user("progress-no-workload")
+    today = datetime.date(2024, 6, 30)
+    app.save_stress_checkin(user_id, checkin(today, workload_rating=None, energy_level=None))
+
+    fig, fig2 = app.build_progress_figures(user_id, *app.progress_window("Last 30 days", today))
+
+    assert fig is not None
+    assert fig2 is None
@@ -0,0 +1,72 @@
+import pytest
+
+import app
+from stub_mistral import DEFAULT_REPLY
+
+WELCOME = {"role": "assistant", "content": "👋 Welcome to WorkZen, alice!", "welcome": True}
+
+
+def context(**extra):
+    return {"recent_stress_level": 6, "time_of_day": 9, "history": [WELCOME], **extra}
+
+
+def test_welcome_message_is_not_sent_to_the_model():
+    messages = app.build_chat_messages("My boss is upset", context(summary=""))
+
+    assert [message["role"] for message in messages] == ["system", "user"]
+
+
+def test_history_free_turns_share_the_cache_only_without_a_summary(stub, monkeypatch):
+    server = stub()
+    monkeypatch.setenv("MISTRAL_API_KEY", "stub")
+    monkeypatch.setattr(app, "get_mistral_client", lambda: app.MistralClient(server.url, max_retries=0))
+
+    first = app.get_ai_response("How do I rest on Sundays? (cache test)", context(summary=""))
+    second = app.get_ai_response("how do I rest on sundays (cache test)", context(summary=""))
+
+    assert first == second == DEFAULT_REPLY
+    assert server.requests_seen == 1
+
+
+def test_summaries_keep_cached_replies_private(stub, monkeypatch):
+    server = stub()
+    monkeypatch.setenv("MISTRAL_API_KEY", "stub")
+    monkeypatch.setattr(app, "get_mistral_client", lambda: app.MistralClient(server.url, max_retries=0))
+
+    app.get_ai_response("How do I rest on Sundays? (summary test)", context(summary="alice's summary"))
+    app.get_ai_response("how do I rest on sundays (summary test)", context(summary="bob's summary"))
+
+    assert server.requests_seen == 2
+    assert "bob's summary" in server.last_payload["messages"][0]["content"]
+
+
+def test_turns_with_history_skip_the_cache(stub, monkeypatch):
+    server = stub()
+    monkeypatch.setenv("MISTRAL_API_KEY", "stub")
+    monkeypatch.setattr(app, "get_mistral_client", lambda: app.MistralClient(server.url, max_retries=0))
+    history = [WELCOME, {"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello"}]
+    cache = app.get_response_cache()
+    lookups = cache.hits + cache.misses
+
+    for _ in range(2):
+        app.get_ai_response("What should I pray about? (history test)", context(summary="", history=history))
+
+    assert server.requests_seen == 2
+    assert cache.hits + cache.misses == lookups
+
+
+@pytest.mark.parametrize("respond", [app.get_ai_response, lambda *args: "".join(app.stream_ai_response(*args))])
+def test_cache_failure_does_not_touch_a_delivered_reply(respond, stub, monkeypatch, caplog):
+    server = stub()
+    monkeypatch.setenv("MISTRAL_API_KEY", "stub")
+    monkeypatch.setattr(app, "get_mistral_client", lambda: app.MistralClient(server.url, max_retries=0))
+
+    def broken_put(key, value):
+        raise RuntimeError("cache is full")
+
+    monkeypatch.setattr(app.get_response_cache(), "put", broken_put)
+
+    reply = respond(f"Is it ok to say no to overtime? ({respond!r})", context(summary=""))
+
+    assert reply == DEFAULT_REPLY
+    assert "could not cache a reply" in caplog.text
@@ -0,0 +1,20 @@
+import app
+
+
+def test_numeric_query_does_not_match_the_user_id():
+    user_id = app.get_or_create_user("search-numeric")
+    app.save_conversation(user_id, "Team meeting ran late again", "Take a breath before the next one.")
+    app.save_prayer_request(user_id, "Patience with my manager")
+
+    assert app.search_user_history(user_id, str(user_id)) == []
+
+
+def test_numeric_query_matches_numbers_in_the_text():
+    user_id = app.get_or_create_user("search-digits")
+    app.save_conversation(user_id, "Worked 60 hours this week", "That is a lot; rest matters too.")
+    app.save_conversation(user_id, "Quiet day at the office", "Enjoy the calm.")
+
+    results = app.search_user_history(user_id, "60")
+
+    assert [result["source"] for result in results] == ["conversation"]
+    assert "**60**" in results[0]["snippet"]
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+import requests
+
+import app
+from stub_mistral import DEFAULT_REPLY
+
+
+class FakeResponse:
+    def __init__(self, lines):
+        self.lines = lines
+
+    def iter_lines(self, decode_unicode=False):
+        return iter(self.lines)
+
+
+def event(content):
+    return "data: " + json.dumps({"choices": [{"delta": {"content": content}}]})
+
+
+def post_stream(url):
+    client = app.MistralClient(url, max_retries=0)
+    headers, payload = app._build_request("stub", [{"role": "user", "content": "hi"}], stream=True)
+    return client.post(headers, payload, stream=True)
+
+
+def test_stream_chunks_assemble_into_the_reply(stub):
+    server = stub()
+    with post_stream(server.url) as response:
+        chunks = list(app._iter_sse_content(response))
+
+    assert len(chunks) == len(DEFAULT_REPLY.split(" "))
+    assert "".join(chunks) == DEFAULT_REPLY
+
+
+def test_stream_stops_at_done_and_skips_other_lines():
+    response = FakeResponse([": keep-alive", "", event("Hello"), "data: {\"choices\": []}", event(" there"),
+                             "data: [DONE]", event(" ignored")])
+
+    assert list(app._iter_sse_content(response)) == ["Hello", " there"]
+
+
+def test_stream_dropped_midway_raises(stub):
+    server = stub(drop_after=3)
+    with post_stream(server.url) as response:
+        chunks = []
+        with pytest.raises(requests.RequestException):
+            for chunk in app._iter_sse_content(response):
+                chunks.append(chunk)
+
+    assert "".join(chunks) == " ".join(DEFAULT_REPLY.split(" ")[:3])
+
+
+def test_stream_ai_response_appends_connection_error_after_partial_reply(stub, monkeypatch):
+    server = stub(drop_after=3)
+    monkeypatch.setenv("MISTRAL_API_KEY", "stub")
+    monkeypatch.setattr(app, "get_mistral_client", lambda: app.MistralClient(server.url, max_retries=0))
+
+    reply = "".join(app.stream_ai_response("My project is slipping (stream drop test)", {"history": []}))
+
+    assert reply == " ".join(DEFAULT_REPLY.split(" ")[:3]) + "\n\n" + app.CONNECTION_ERROR_RESPONSE
@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+
+import app
+
+
+def test_overflow_write_waits_for_the_users_queued_writes(tmp_path):
+    db = app.Database(str(tmp_path / "queue.db"))
+    with db.connection() as conn:
+        app.migrate(conn)
+    writer = app.WriteBehindQueue(db, max_pending=1, linger=0, put_timeout=0.01)
+
+    # Hold the writer thread inside its first batch so the queue fills up.
+    release = threading.Event()
+    write = writer._write
+
+    def slow_write(batch):
+        if threading.current_thread() is writer._thread:
+            release.wait(5)
+        write(batch)
+
+    writer._write = slow_write
+    insert = 'INSERT INTO conversations (user_id, message, response) VALUES (?, ?, ?)'
+    writer.submit(1, insert, (1, "queued 0", ""))
+    while not writer._queue.empty():
+        time.sleep(0.01)
+    writer.submit(1, insert, (1, "queued 1", ""))
+
+    overflow = threading.Thread(target=writer.submit, args=(1, insert, (1, "overflow", "")))
+    overflow.start()
+    overflow.join(0.2)
+    assert overflow.is_alive()
+
+    release.set()
+    overflow.join(5)
+    writer.close()
+    with db.connection() as conn:
+        messages = [row[0] for row in conn.execute('SELECT message FROM conversations ORDER BY id')]
+    assert messages == ["queued 0", "queued 1", "overflow"]
+
+
+def test_failed_overflow_write_does_not_leave_the_user_pending(tmp_path):
+    db = app.Database(str(tmp_path / "queue.db"))
+    with db.connection() as conn:
+        app.migrate(conn)
+    writer = app.WriteBehindQueue(db, max_pending=1, linger=0, put_timeout=0.01)
+
+    release = threading.Event()
+    write = writer._write
+
+    def failing_write(batch):
+        if threading.current_thread() is writer._thread:
+            release.wait(5)
+            write(batch)
+        else:
+            raise app.sqlite3.OperationalError("database is locked")
+
+    writer._write = failing_write
+    insert = 'INSERT INTO conversations (user_id, message, response) VALUES (?, ?, ?)'
+    writer.submit(1, insert, (1, "queued 0", ""))
+    while not writer._queue.empty():
+        time.sleep(0.01)
+    writer.submit(1, insert, (1, "queued 1", ""))
+
+    threading.Timer(0.1, release.set).start()
+    with pytest.raises(app.sqlite3.OperationalError):
+        writer.submit(1, insert, (1, "overflow", ""))
+
+    assert writer.sync(1, timeout=5)
+    writer.close()
@@ -0,0 +1,177 @@
+"""Local stand-in for the Mistral chat completions endpoint.
+
+Serves POST /v1/chat/completions with either a JSON body or, when the
+payload sets "stream": true, server-sent events in the same shape as the
+real API. Latency, error responses and streams cut off part way can be
+injected to exercise the client's retries and circuit breaker. Point the app at it with:
+
+    python tools/stub_mistral.py --port 8089
+    MISTRAL_API_KEY=stub MISTRAL_API_URL=http://127.0.0.1:8089/v1/chat/completions streamlit run app.py
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = (
+    "Thank you for sharing that with me. Remember Philippians 4:6-7: bring your "
+    "worries to God in prayer, and His peace will guard your heart. What is one "
+    "small step you could take at work today?"
+)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; with Nagle on, keep-alive
+    # clients wait out a ~40 ms delayed ACK on every JSON response.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        self.server.requests_seen += 1
+        self.server.last_payload = payload
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        status = self.server.next_error_status()
+        if status:
+            headers = {}
+            if self.server.retry_after is not None:
+                headers["Retry-After"] = str(self.server.retry_after)
+            self._send_json(status, {"message": "injected error"}, headers)
+            return
+
+        reply = self.server.reply
+        if payload.get("stream"):
+            try:
+                self._send_stream(reply)
+            except (BrokenPipeError, ConnectionResetError):
+                # Clients may hang up as soon as they read "data: [DONE]".
+                self.close_connection = True
+        else:
+            self._send_json(200, {
+                "id": "stub",
+                "object": "chat.completion",
+                "model": payload.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply},
+                             "finish_reason": "stop"}],
+            })
+
+    def _send_json(self, status, body, extra_headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, reply):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        words = reply.split(" ")
+        for i, word in enumerate(words):
+            if self.server.drop_after is not None and i >= self.server.drop_after:
+                # Hang up without the terminating chunk, like a dropped connection.
+                self.close_connection = True
+                return
+            content = word if i == 0 else " " + word
+            event = {"id": "stub", "object": "chat.completion.chunk",
+                     "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": None}]}
+            self._write_chunk(f"data: {json.dumps(event)}\n\n")
+            if self.server.chunk_delay:
+                time.sleep(self.server.chunk_delay)
+        self._write_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, text):
+        data = text.encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, reply=DEFAULT_REPLY, latency=0.0, chunk_delay=0.0, error_rate=0.0,
+                 fail_first=0, error_status=503, retry_after=None, drop_after=None, verbose=False):
+        super().__init__(address, StubHandler)
+        self.reply = reply
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.error_rate = error_rate
+        self.fail_first = fail_first
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.drop_after = drop_after
+        self.verbose = verbose
+        self.requests_seen = 0
+        self.last_payload = None
+        self._lock = threading.Lock()
+
+    def next_error_status(self):
+        with self._lock:
+            if self.fail_first > 0:
+                self.fail_first -= 1
+                return self.error_status
+        if self.error_rate and random.random() < self.error_rate:
+            return self.error_status
+        return None
+
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+
+def start_stub_server(port=0, **options) -> StubServer:
+    server = StubServer(("127.0.0.1", port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake Mistral chat completions API.")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--reply", default=DEFAULT_REPLY)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before the response starts")
+    parser.add_argument("--chunk-delay", type=float, default=0.05, help="seconds between streamed chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with an error")
+    parser.add_argument("--fail-first", type=int, default=0, help="answer the first N requests with an error")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--retry-after", type=int, default=None, help="Retry-After seconds sent with errors")
+    parser.add_argument("--drop-after", type=int, default=None, help="cut streams off after N chunks")
+    args = parser.parse_args()
+
+    server = StubServer(("127.0.0.1", args.port), reply=args.reply, latency=args.latency,
+                        chunk_delay=args.chunk_delay, error_rate=args.error_rate,
+                        fail_first=args.fail_first, error_status=args.error_status,
+                        retry_after=args.retry_after, drop_after=args.drop_after, verbose=True)
+    print(f"Stub Mistral API listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()